@@ -45,7 +45,18 @@ class JsonHandler:
             "batch_retry_timeout",
             "number_of_concurrent_batches",
             "gender_context_insertion",
-            "is_cote"
+            "is_cote",
+            "use_translation_memory",
+            "use_line_memory",
+            "use_adaptive_concurrency",
+            "number_of_tokens_per_batch",
+            "bisect_malformed_batches",
+            "failover_translation_method",
+            "failover_after_seconds",
+            "hedge_slow_requests",
+            "max_hedged_request_fraction",
+            "priority_batch_range",
+            "preview_batch_count"
         ]
 
         openai_keys = [
@@ -59,7 +70,11 @@ class JsonHandler:
             "openai_logit_bias",
             "openai_max_tokens",
             "openai_presence_penalty",
-            "openai_frequency_penalty"
+            "openai_frequency_penalty",
+            "openai_requests_per_minute",
+            "openai_tokens_per_minute",
+            "openai_use_batch_api",
+            "openai_batch_poll_seconds"
         ]
 
         gemini_keys = [
@@ -71,7 +86,9 @@ class JsonHandler:
             "gemini_candidate_count",
             "gemini_stream",
             "gemini_stop_sequences",
-            "gemini_max_output_tokens"
+            "gemini_max_output_tokens",
+            "gemini_requests_per_minute",
+            "gemini_tokens_per_minute"
         ]
 
         deepl_keys = [
@@ -90,6 +107,17 @@ class JsonHandler:
             "batch_retry_timeout": lambda x: isinstance(x, int) and x >= 0,
             "gender_context_insertion": lambda x: isinstance(x, bool),
             "is_cote": lambda x: isinstance(x, bool),
+            "use_translation_memory": lambda x: isinstance(x, bool),
+            "use_line_memory": lambda x: isinstance(x, bool),
+            "use_adaptive_concurrency": lambda x: isinstance(x, bool),
+            "number_of_tokens_per_batch": lambda x: x is None or isinstance(x, int) and x > 0,
+            "bisect_malformed_batches": lambda x: isinstance(x, bool),
+            "failover_translation_method": lambda x: x is None or x in ["openai", "gemini", "deepl", "google translate", "mock"],
+            "failover_after_seconds": lambda x: isinstance(x, int) and x >= 0,
+            "hedge_slow_requests": lambda x: isinstance(x, bool),
+            "max_hedged_request_fraction": lambda x: isinstance(x, float) and 0 <= x <= 1,
+            "priority_batch_range": lambda x: x is None or (isinstance(x, str) and len(x.split("-")) == 2 and all(part.strip().isdigit() and int(part) > 0 for part in x.split("-"))),
+            "preview_batch_count": lambda x: isinstance(x, int) and x >= 0,
             "number_of_concurrent_batches": lambda x: isinstance(x, int) and x >= 0,
             "openai_model": lambda x: isinstance(x, str) and x in ALLOWED_OPENAI_MODELS,
             "openai_system_message": lambda x: x not in ["", "None", None],
@@ -103,6 +131,12 @@ class JsonHandler:
             "gemini_top_p": lambda x: x is None or (isinstance(x, float) and 0 <= x <= 2),
             "gemini_top_k": lambda x: x is None or (isinstance(x, int) and x >= 0),
             "gemini_max_output_tokens": lambda x: x is None or isinstance(x, int),
+            "openai_requests_per_minute": lambda x: x is None or isinstance(x, int) and x > 0,
+            "openai_tokens_per_minute": lambda x: x is None or isinstance(x, int) and x > 0,
+            "openai_use_batch_api": lambda x: isinstance(x, bool),
+            "openai_batch_poll_seconds": lambda x: isinstance(x, int) and x > 0,
+            "gemini_requests_per_minute": lambda x: x is None or isinstance(x, int) and x > 0,
+            "gemini_tokens_per_minute": lambda x: x is None or isinstance(x, int) and x > 0,
             "deepl_context": lambda x: isinstance(x, str),
             "deepl_split_sentences": lambda x: isinstance(x, str),
             "deepl_preserve_formatting": lambda x: isinstance(x, bool),
@@ -332,6 +366,17 @@ class JsonHandler:
             "number_of_concurrent_batches": {"type": int, "constraints": lambda x: x >= 0},
             "gender_context_insertion": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
             "is_cote": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "use_translation_memory": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "use_line_memory": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "use_adaptive_concurrency": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "number_of_tokens_per_batch": {"type": int, "constraints": lambda x: x is None or x > 0},
+            "bisect_malformed_batches": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "failover_translation_method": {"type": str, "constraints": lambda x: x is None or x in ["openai", "gemini", "deepl", "google translate", "mock"]},
+            "failover_after_seconds": {"type": int, "constraints": lambda x: x >= 0},
+            "hedge_slow_requests": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "max_hedged_request_fraction": {"type": float, "constraints": lambda x: 0 <= x <= 1},
+            "priority_batch_range": {"type": str, "constraints": lambda x: x is None or (isinstance(x, str) and len(x.split("-")) == 2 and all(part.strip().isdigit() and int(part) > 0 for part in x.split("-")))},
+            "preview_batch_count": {"type": int, "constraints": lambda x: x >= 0},
             "openai_model": {"type": str, "constraints": lambda x: x in ALLOWED_OPENAI_MODELS},
             "openai_system_message": {"type": str, "constraints": lambda x: x not in ["", "None", None]},
             "openai_temperature": {"type": float, "constraints": lambda x: 0 <= x <= 2},
@@ -352,6 +397,12 @@ class JsonHandler:
             "gemini_stream": {"type": bool, "constraints": lambda x: x is False},
             "gemini_stop_sequences": {"type": None, "constraints": lambda x: x is None},
             "gemini_max_output_tokens": {"type": int, "constraints": lambda x: x is None or isinstance(x, int)},
+            "openai_requests_per_minute": {"type": int, "constraints": lambda x: x is None or x > 0},
+            "openai_tokens_per_minute": {"type": int, "constraints": lambda x: x is None or x > 0},
+            "openai_use_batch_api": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
+            "openai_batch_poll_seconds": {"type": int, "constraints": lambda x: x > 0},
+            "gemini_requests_per_minute": {"type": int, "constraints": lambda x: x is None or x > 0},
+            "gemini_tokens_per_minute": {"type": int, "constraints": lambda x: x is None or x > 0},
             "deepl_context": {"type": str, "constraints": lambda x: isinstance(x, str)},
             "deepl_split_sentences": {"type": str, "constraints": lambda x: isinstance(x, str)},
             "deepl_preserve_formatting": {"type": bool, "constraints": lambda x: isinstance(x, bool)},
@@ -372,6 +423,10 @@ class JsonHandler:
         if(setting_info["type"] is None):
             converted_value = None
 
+        ## optional strings, like failover_translation_method
+        elif(value is None and setting_info["type"] == str):
+            converted_value = None
+
         elif(setting_info["type"] == int) or (setting_info["type"] == float):
 
             if(value is None or value == ''):
@@ -307,11 +307,11 @@ async def main() -> None:
         if(len(sys.argv) <= 1):
             await run_console_version()
 
-        elif(len(sys.argv) in [2, 3, 4, 5, 6]):
+        elif(len(sys.argv) in [2, 3, 4, 5, 6, 7]):
             await run_cli_version()
 
         else:
-            print(f"Invalid number of arguments ({len(sys.argv)}), max of 6. Please use --help for more information.")
+            print(f"Invalid number of arguments ({len(sys.argv)}), max of 7. Please use --help for more information.")
             print_usage_statement()
 
     except Exception as e:
@@ -367,7 +367,8 @@ async def run_cli_version():
         """
 
         conditions = [
-            (lambda arg: arg in ["deepl", "openai", "gemini", "google_translate"], "translation_method"),
+            (lambda arg: arg in ["deepl", "openai", "gemini", "google_translate", "mock"], "translation_method"),
+            (lambda arg: arg == "--resume", "resume"),
             (lambda arg: os.path.exists(arg) and not ".json" in arg, "text_to_translate"),
             (lambda arg: len(arg) > 10 and not os.path.exists(arg), "api_key"),
             (lambda arg: arg == "translate", "identifier"),
@@ -380,7 +381,7 @@ async def run_cli_version():
                 logging.debug(f"Determined argument for '{arg}' as '{result}'")
                 return result
             
-        raise Exception("Invalid argument. Please use 'deepl', 'openai', or 'gemini', or 'google_translate')")
+        raise Exception("Invalid argument. Please use 'deepl', 'openai', or 'gemini', or 'google_translate', or 'mock')")
     
     mode = ""
 
@@ -420,7 +421,8 @@ async def run_cli_version():
                 "gemini": "2",
                 "deepl": "3",
                 "google_translate": "4",
-                "google translate": "4"
+                "google translate": "4",
+                "mock": "5"
             }
 
             Kudasai.text_to_preprocess = FileEnsurer.standard_read_file(sys.argv[arg_indices['text_to_translate_index']].strip('"'))
@@ -435,6 +437,7 @@ async def run_cli_version():
                 "translation_method": lambda arg: setattr(Translator, 'TRANSLATION_METHOD', method_to_translation_mode[arg]),
                 "translation_settings_json": lambda arg: setattr(JsonHandler, 'current_translation_settings', FileEnsurer.standard_read_json(arg)),
                 "api_key": lambda arg: setattr(Translator, 'pre_provided_api_key', arg),
+                "resume": lambda arg: setattr(Translator, 'is_resuming', True),
                 "identifier": lambda arg: None,
                 "text_to_translate": lambda arg: setattr(Kudasai, 'text_to_preprocess', FileEnsurer.standard_read_file(arg))
             }
@@ -492,6 +495,7 @@ Modes:
       <translation_method>      Translation method to use ('deepl', 'openai', or 'gemini'). This defaults to deepl
       <translation_settings_json> Path to the translation settings JSON file. This will override the current loaded settings.
       <api_key>                  API key for the translation service. If not provided, it will use the one on file, otherwise it will ask if not provided
+      --resume                   Resumes an interrupted run of the same text, only the batches it did not finish are translated.
 
     Example:
       {python_command} Kudasai.py translate "C:\\path\\to\\input_file.txt" gemini "C:\\path\\to\\translation_settings.json" "YOUR API KEY"
@@ -500,6 +504,7 @@ Additional Notes:
 - All arguments should be enclosed in double quotes if they contain spaces. But double quotes are optional and will be striped. Single quotes are not allowed
 - For more information, refer to the documentation at README.md
 - For google translate, enter the method as 'google_translate', also google_translate doesn't support the api_key argument
+- 'mock' translates offline with a fake service for testing and benchmarking, configured by mock_provider_settings.json next to Kudasai.py (see README.md)
 """)
 
 
@@ -0,0 +1,214 @@
+## built-in libraries
+import time
+import typing
+import asyncio
+import logging
+import collections
+
+##-------------------start-of-AdaptiveLimiter---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class AdaptiveLimiter:
+
+    """
+
+    AdaptiveLimiter limits how many batches are in flight at once, like a semaphore whose size adjusts itself (AIMD).
+    While requests come back quickly and without errors, the limit is raised additively. On a rate limit or server error, it is cut multiplicatively.
+
+    Used as an async context manager, same as asyncio.Semaphore.
+
+    """
+
+    ## the limit grows by this much per limit's worth of successful requests, so roughly one more batch per round trip
+    ADDITIVE_INCREASE = 1.0
+
+    ## the limit is multiplied by this on a rate limit or server error
+    MULTIPLICATIVE_DECREASE = 0.5
+
+    ## the limit only grows while the smoothed latency is within this factor of the best smoothed latency seen
+    LATENCY_TOLERANCE = 2.0
+
+    ## weight of the newest latency in the smoothed latency
+    LATENCY_SMOOTHING = 0.2
+
+    ## errors closer together than this (in seconds, or the smoothed latency if that is longer) only cut the limit once, a single overload usually fails a whole window of requests
+    MIN_DECREASE_INTERVAL = 1.0
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, initial_limit:int, min_limit:int=1, max_limit:typing.Optional[int]=None, is_adaptive:bool=True) -> None:
+
+        """
+
+        Parameters:
+        initial_limit (int) : The limit to start with.
+        min_limit (int | optional | default=1) : The lowest the limit can be cut to.
+        max_limit (int | optional | default=None) : The highest the limit can grow to, defaults to initial_limit.
+        is_adaptive (bool | optional | default=True) : Whether the limit adjusts at all, if False this behaves like asyncio.Semaphore(initial_limit).
+
+        """
+
+        self.initial_limit = max(initial_limit, min_limit)
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit or self.initial_limit, self.initial_limit)
+        self.is_adaptive = is_adaptive
+
+        self.limit = float(self.initial_limit)
+        self.lowest_limit = self.initial_limit
+        self.highest_limit = self.initial_limit
+
+        self.in_flight = 0
+        self.waiters:typing.Deque[asyncio.Future] = collections.deque()
+
+        self.smoothed_latency:typing.Optional[float] = None
+        self.best_latency:typing.Optional[float] = None
+
+        self.last_decrease_time = 0.0
+
+        self.num_decreases = 0
+
+##-------------------start-of-current_limit()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def current_limit(self) -> int:
+
+        """
+
+        Returns:
+        (int) : How many batches are currently allowed in flight.
+
+        """
+
+        return int(self.limit)
+
+##-------------------start-of-acquire()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def acquire(self) -> None:
+
+        """
+
+        Waits until there is room for another batch, batches are let through in the order they started waiting.
+
+        """
+
+        ## nobody can skip ahead of a batch already waiting
+        if(self.in_flight < self.current_limit and not self.waiters):
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+
+        try:
+            await waiter
+
+        except asyncio.CancelledError:
+
+            ## the room was already handed over, so pass it on
+            if(waiter.done() and not waiter.cancelled()):
+                self.release()
+
+            raise
+
+        finally:
+            if(waiter in self.waiters):
+                self.waiters.remove(waiter)
+
+##-------------------start-of-release()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def release(self) -> None:
+
+        """
+
+        Frees the room taken by a batch.
+
+        """
+
+        self.in_flight -= 1
+        self.wake_waiters()
+
+##-------------------start-of-wake_waiters()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def wake_waiters(self) -> None:
+
+        """
+
+        Wakes as many waiting batches as there is room for, handing the room over directly so a woken batch can't lose it to a later one.
+
+        """
+
+        while(self.in_flight < self.current_limit and self.waiters):
+
+            waiter = self.waiters.popleft()
+
+            if(not waiter.done()):
+                waiter.set_result(None)
+                self.in_flight += 1
+
+##-------------------start-of-on_success()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def on_success(self, latency:float) -> None:
+
+        """
+
+        Records a successful request, raising the limit if latency is healthy.
+
+        Parameters:
+        latency (float) : How long the request took, in seconds.
+
+        """
+
+        self.smoothed_latency = latency if self.smoothed_latency is None else (1 - AdaptiveLimiter.LATENCY_SMOOTHING) * self.smoothed_latency + AdaptiveLimiter.LATENCY_SMOOTHING * latency
+        self.best_latency = self.smoothed_latency if self.best_latency is None else min(self.best_latency, self.smoothed_latency)
+
+        if(not self.is_adaptive or self.smoothed_latency > self.best_latency * AdaptiveLimiter.LATENCY_TOLERANCE):
+            return
+
+        previous_limit = self.current_limit
+
+        self.limit = min(float(self.max_limit), self.limit + AdaptiveLimiter.ADDITIVE_INCREASE / self.limit)
+
+        if(self.current_limit != previous_limit):
+            self.highest_limit = max(self.highest_limit, self.current_limit)
+            logging.info(f"Raised concurrency limit to {self.current_limit}.")
+            self.wake_waiters()
+
+##-------------------start-of-on_overload()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def on_overload(self) -> None:
+
+        """
+
+        Records a rate limit or server error, cutting the limit.
+
+        """
+
+        if(not self.is_adaptive):
+            return
+
+        now = time.monotonic()
+
+        if(now - self.last_decrease_time < max(AdaptiveLimiter.MIN_DECREASE_INTERVAL, self.smoothed_latency or 0.0)):
+            return
+
+        self.last_decrease_time = now
+        self.num_decreases += 1
+
+        previous_limit = self.current_limit
+
+        self.limit = max(float(self.min_limit), self.limit * AdaptiveLimiter.MULTIPLICATIVE_DECREASE)
+
+        if(self.current_limit != previous_limit):
+            self.lowest_limit = min(self.lowest_limit, self.current_limit)
+            logging.warning(f"Lowered concurrency limit to {self.current_limit} after a rate limit or server error.")
+
+##-------------------start-of-__aenter__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aenter__(self) -> None:
+
+        await self.acquire()
+
+##-------------------start-of-__aexit__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+
+        self.release()
@@ -0,0 +1,288 @@
+## built-in libraries
+import os
+import json
+import typing
+import asyncio
+import hashlib
+import logging
+
+## third-party libraries
+from openai import AsyncOpenAI
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-BatchJob---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class BatchJob:
+
+    """
+
+    BatchJob sends the batches of a run to OpenAI's Batch API as a single job, which costs half as much as sending them one by one but can take up to a day.
+    The requests are written to a JSON lines file, uploaded and submitted, and the job is polled until it's done.
+    The id of the job is saved next to the file, so a resumed run picks the job back up instead of submitting (and paying for) it again.
+
+    The API's base url can be pointed elsewhere with the OPENAI_BASE_URL environment variable, e.g. at util/mock_batch_server.py.
+
+    """
+
+    ENDPOINT = "/v1/chat/completions"
+    COMPLETION_WINDOW = "24h"
+
+    ## statuses a job doesn't leave
+    FINISHED_STATUSES = ["completed", "failed", "expired", "cancelled"]
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, api_key:str, job_path:typing.Optional[str]=None, state_path:typing.Optional[str]=None, poll_interval:float=60) -> None:
+
+        """
+
+        Parameters:
+        api_key (str) : The OpenAI API key.
+        job_path (str | optional | default=None) : Where the requests are written, defaults to FileEnsurer.batch_job_path.
+        state_path (str | optional | default=None) : Where the id of the submitted job is saved, defaults to FileEnsurer.batch_job_state_path.
+        poll_interval (float | optional | default=60) : How long to wait between checks on the job, in seconds.
+
+        """
+
+        self.client = AsyncOpenAI(api_key=api_key)
+
+        self.job_path = job_path or FileEnsurer.batch_job_path
+        self.state_path = state_path or FileEnsurer.batch_job_state_path
+
+        self.poll_interval = poll_interval
+
+##-------------------start-of-make_request()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def make_request(batch_number:int, model:str, instructions:str, prompt:str, sampling_settings:dict) -> dict:
+
+        """
+
+        Makes the request of a batch, in the format of a line of a batch job.
+
+        Parameters:
+        batch_number (int) : The batch number, which the result is matched back to.
+        model (str) : The model.
+        instructions (str) : The system message.
+        prompt (str) : The text to translate.
+        sampling_settings (dict) : temperature, top_p and the like, None values are left out.
+
+        Returns:
+        (dict) : The request.
+
+        """
+
+        body = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt}
+            ],
+            **{key: value for key, value in sampling_settings.items() if value is not None}
+        }
+
+        return {"custom_id": f"batch-{batch_number}", "method": "POST", "url": BatchJob.ENDPOINT, "body": body}
+
+##-------------------start-of-write()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def write(self, requests:typing.List[dict]) -> str:
+
+        """
+
+        Writes the requests to the job file.
+
+        Parameters:
+        requests (list - dict) : The requests, from make_request().
+
+        Returns:
+        job_hash (str) : A hash of the file, identifying the job.
+
+        """
+
+        FileEnsurer.standard_create_directory(os.path.dirname(self.job_path))
+
+        content = "".join(json.dumps(request, ensure_ascii=False) + "\n" for request in requests)
+
+        with open(self.job_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+##-------------------start-of-load_job_id()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def load_job_id(self, job_hash:str) -> typing.Optional[str]:
+
+        """
+
+        Loads the id of the job submitted by the previous run, if it was the same job.
+
+        Parameters:
+        job_hash (str) : The hash of the job file.
+
+        Returns:
+        (str | None) : The id, None if there isn't one.
+
+        """
+
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        return state.get("job_id") if state.get("job_hash") == job_hash else None
+
+##-------------------start-of-submit()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def submit(self, job_hash:str) -> str:
+
+        """
+
+        Uploads the job file and submits it, saving the id of the job.
+
+        Parameters:
+        job_hash (str) : The hash of the job file.
+
+        Returns:
+        job_id (str) : The id of the job.
+
+        """
+
+        with open(self.job_path, 'rb') as file:
+            uploaded_file = await self.client.files.create(file=file, purpose="batch")
+
+        job = await self.client.batches.create(input_file_id=uploaded_file.id, endpoint=BatchJob.ENDPOINT, completion_window=BatchJob.COMPLETION_WINDOW) # type: ignore
+
+        with open(self.state_path, 'w', encoding='utf-8') as file:
+            json.dump({"job_hash": job_hash, "job_id": job.id}, file)
+
+        logging.info(f"Submitted batch job {job.id}.")
+
+        return job.id
+
+##-------------------start-of-wait()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def wait(self, job_id:str) -> typing.Any:
+
+        """
+
+        Polls the job until it's done.
+
+        Parameters:
+        job_id (str) : The id of the job.
+
+        Returns:
+        job (openai.types.Batch) : The finished job.
+
+        """
+
+        while True:
+            job = await self.client.batches.retrieve(job_id)
+
+            request_counts = job.request_counts
+
+            if(request_counts is not None):
+                logging.info(f"Batch job {job_id} is {job.status}, {request_counts.completed} of {request_counts.total} requests done ({request_counts.failed} failed).")
+
+            else:
+                logging.info(f"Batch job {job_id} is {job.status}.")
+
+            if(job.status in BatchJob.FINISHED_STATUSES):
+                return job
+
+            await asyncio.sleep(self.poll_interval)
+
+##-------------------start-of-fetch_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def fetch_results(self, job:typing.Any) -> typing.Dict[int, str]:
+
+        """
+
+        Downloads the results of a finished job.
+
+        Parameters:
+        job (openai.types.Batch) : The finished job.
+
+        Returns:
+        results (dict) : Batch number -> translation, for the requests that succeeded.
+
+        """
+
+        results:typing.Dict[int, str] = {}
+
+        if(job.output_file_id is None):
+            return results
+
+        content = await self.client.files.content(job.output_file_id)
+
+        for line in content.text.splitlines():
+
+            if(not line.strip()):
+                continue
+
+            result = json.loads(line)
+            response = result.get("response") or {}
+
+            if(response.get("status_code") != 200):
+                continue
+
+            try:
+                results[int(result["custom_id"].removeprefix("batch-"))] = response["body"]["choices"][0]["message"]["content"]
+
+            except (KeyError, IndexError, ValueError):
+                logging.warning(f"Could not read the result of {result.get('custom_id')} from batch job {job.id}.")
+
+        return results
+
+##-------------------start-of-run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def run(self, requests:typing.List[dict], resume:bool=False) -> typing.Dict[int, str]:
+
+        """
+
+        Writes, submits and waits on a job, then downloads its results.
+
+        Parameters:
+        requests (list - dict) : The requests, from make_request().
+        resume (bool | optional | default=False) : Whether to pick up the job the previous run submitted, if it was the same job.
+
+        Returns:
+        results (dict) : Batch number -> translation, for the requests that succeeded.
+
+        """
+
+        job_hash = self.write(requests)
+
+        job_id = self.load_job_id(job_hash) if resume else None
+
+        if(job_id is not None):
+            logging.info(f"Resuming batch job {job_id}.")
+
+        else:
+            job_id = await self.submit(job_hash)
+
+        job = await self.wait(job_id)
+
+        results = await self.fetch_results(job)
+
+        if(job.status != "completed"):
+            logging.warning(f"Batch job {job_id} ended as {job.status}.")
+
+        logging.info(f"Batch job {job_id} translated {len(results)} of {len(requests)} batches.")
+
+        return results
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def close(self) -> None:
+
+        """
+
+        Closes the client's connections, the job itself keeps going on OpenAI's side.
+
+        """
+
+        await self.client.close()
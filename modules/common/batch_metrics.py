@@ -0,0 +1,215 @@
+## built-in libraries
+import json
+import time
+import typing
+import logging
+import contextvars
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-BatchMetrics---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class BatchMetrics:
+
+    """
+
+    BatchMetrics records how each batch of a translation run went: queue wait, request latency, requests, retries, malformed responses, provider, sizes and outcome.
+    Each batch is appended to a JSON lines file as soon as it finishes, and a Prometheus text-format snapshot of the whole run is written when the metrics are closed.
+
+    """
+
+    ## the quantiles of the summaries in the Prometheus snapshot
+    SUMMARY_QUANTILES = [0.5, 0.9, 0.95, 0.99]
+
+    ## the metrics of the batch the current task is handling, so retries deep inside the backoff decorator can be counted against it
+    ## every batch runs in its own task, which has its own copy of the context
+    current_batch:contextvars.ContextVar[typing.Optional[dict]] = contextvars.ContextVar("current_batch", default=None)
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, metrics_path:typing.Optional[str]=None, prometheus_path:typing.Optional[str]=None) -> None:
+
+        """
+
+        Opens (and truncates) the JSON lines file.
+
+        Parameters:
+        metrics_path (str | optional | default=None) : The path to the JSON lines file, defaults to FileEnsurer.batch_metrics_path.
+        prometheus_path (str | optional | default=None) : The path to the Prometheus snapshot, defaults to FileEnsurer.batch_metrics_prometheus_path.
+
+        """
+
+        self.metrics_path = metrics_path or FileEnsurer.batch_metrics_path
+        self.prometheus_path = prometheus_path or FileEnsurer.batch_metrics_prometheus_path
+
+        self.start_time = time.perf_counter()
+
+        ## the finished batches, in the order they finished
+        self.batches:typing.List[dict] = []
+
+        self.file = open(self.metrics_path, 'w', encoding='utf-8')
+
+##-------------------start-of-start_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def start_batch(self, batch_number:int, input_text:str) -> dict:
+
+        """
+
+        Starts recording a batch, making it the current batch of the calling task.
+
+        Parameters:
+        batch_number (int) : The batch number.
+        input_text (str) : The text of the batch.
+
+        Returns:
+        batch (dict) : The metrics of the batch, filled in as it goes.
+
+        """
+
+        batch = {
+            "batch_number": batch_number,
+            "provider": None,
+            "outcome": None,
+            "started_at": round(time.perf_counter() - self.start_time, 4),
+            "finished_at": None,
+            "queue_wait": 0.0,
+            "request_latency": 0.0,
+            "num_requests": 0,
+            "num_hedged_requests": 0,
+            "num_retries": 0,
+            "num_malformed": 0,
+            "input_lines": len([line for line in input_text.split('\n') if line.strip()]),
+            "input_characters": len(input_text),
+            "output_lines": 0,
+            "output_characters": 0
+        }
+
+        BatchMetrics.current_batch.set(batch)
+
+        return batch
+
+##-------------------start-of-count()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def count(key:str, amount:float=1) -> None:
+
+        """
+
+        Adds to a metric of the current batch, does nothing outside of a batch.
+
+        Parameters:
+        key (str) : The metric, e.g. num_retries.
+        amount (float | optional | default=1) : How much to add.
+
+        """
+
+        batch = BatchMetrics.current_batch.get()
+
+        if(batch is not None):
+            batch[key] += amount
+
+##-------------------start-of-finish_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def finish_batch(self, batch:dict, provider:str, outcome:str, output_text:str) -> None:
+
+        """
+
+        Finishes recording a batch and appends it to the JSON lines file.
+
+        Parameters:
+        batch (dict) : The metrics from start_batch().
+        provider (str) : What served the batch, a translation method, or the journal/memory it was reused from.
+        outcome (str) : translated, malformed, unchecked, untranslated or reused.
+        output_text (str) : The translated text of the batch.
+
+        """
+
+        batch["provider"] = provider
+        batch["outcome"] = outcome
+        batch["finished_at"] = round(time.perf_counter() - self.start_time, 4)
+        batch["queue_wait"] = round(batch["queue_wait"], 4)
+        batch["request_latency"] = round(batch["request_latency"], 4)
+        batch["output_lines"] = len([line for line in output_text.split('\n') if line.strip()])
+        batch["output_characters"] = len(output_text)
+
+        self.batches.append(batch)
+
+        self.file.write(json.dumps(batch, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+##-------------------start-of-get_prometheus_snapshot()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_prometheus_snapshot(self, gauges:typing.Dict[str, typing.Tuple[str, float]]) -> str:
+
+        """
+
+        Builds the Prometheus text-format snapshot of the run.
+
+        Parameters:
+        gauges (dict) : Run-wide values to include, name -> (help text, value).
+
+        Returns:
+        snapshot (str) : The snapshot.
+
+        """
+
+        lines = []
+
+        def add_metric(name:str, metric_type:str, help_text:str, samples:typing.List[typing.Tuple[str, float]]) -> None:
+            lines.append(f"# HELP kudasai_{name} {help_text}")
+            lines.append(f"# TYPE kudasai_{name} {metric_type}")
+            lines.extend(f"kudasai_{name}{suffix}{labels} {value}" for suffix, labels, value in samples)
+
+        def add_counter(name:str, help_text:str, key:typing.Optional[str]=None, group_by_outcome:bool=False) -> None:
+            totals:typing.Dict[str, float] = {}
+
+            for batch in self.batches:
+                labels = f'{{provider="{batch["provider"]}",outcome="{batch["outcome"]}"}}' if group_by_outcome else f'{{provider="{batch["provider"]}"}}'
+                totals[labels] = totals.get(labels, 0) + (batch[key] if key is not None else 1)
+
+            add_metric(name, "counter", help_text, [("", labels, total) for labels, total in sorted(totals.items())])
+
+        def add_summary(name:str, help_text:str, values:typing.List[float]) -> None:
+            values = sorted(values)
+            samples = [("", f'{{quantile="{quantile}"}}', values[int((len(values) - 1) * quantile)]) for quantile in BatchMetrics.SUMMARY_QUANTILES] if values else []
+            add_metric(name, "summary", help_text, samples + [("_sum", "", round(sum(values), 4)), ("_count", "", len(values))])
+
+        add_counter("batches_total", "Batches by what served them and how they turned out.", group_by_outcome=True)
+        add_counter("batch_requests_total", "Requests sent for batches, including retries of malformed responses, splits and hedges.", "num_requests")
+        add_counter("batch_hedged_requests_total", "Duplicate requests sent for slow batches.", "num_hedged_requests")
+        add_counter("batch_retries_total", "Requests retried after an error.", "num_retries")
+        add_counter("batch_malformed_total", "Malformed responses.", "num_malformed")
+        add_counter("batch_input_characters_total", "Characters sent for translation.", "input_characters")
+        add_counter("batch_output_characters_total", "Characters received.", "output_characters")
+
+        ## batches reused from the journal or a memory never sent a request
+        requested_batches = [batch for batch in self.batches if batch["num_requests"] > 0]
+
+        add_summary("batch_request_latency_seconds", "Time a batch spent on requests, including retries.", [batch["request_latency"] for batch in requested_batches])
+        add_summary("batch_queue_wait_seconds", "Time a batch waited for a concurrency slot.", [batch["queue_wait"] for batch in requested_batches])
+
+        for name, (help_text, value) in gauges.items():
+            add_metric(name, "gauge", help_text, [("", "", value)])
+
+        return "\n".join(lines) + "\n"
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self, gauges:typing.Optional[typing.Dict[str, typing.Tuple[str, float]]]=None) -> None:
+
+        """
+
+        Writes the Prometheus snapshot and closes the JSON lines file.
+
+        Parameters:
+        gauges (dict | optional | default=None) : Run-wide values to include in the snapshot, name -> (help text, value).
+
+        """
+
+        self.file.close()
+
+        with open(self.prometheus_path, 'w', encoding='utf-8') as file:
+            file.write(self.get_prometheus_snapshot(gauges or {}))
+
+        logging.debug(f"Batch metrics of {len(self.batches)} batches written to {self.metrics_path} and {self.prometheus_path}.")
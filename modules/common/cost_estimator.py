@@ -0,0 +1,350 @@
+## built-in libraries
+import os
+import json
+import typing
+import hashlib
+import logging
+import threading
+
+## third-party libraries
+from easytl import MODEL_COSTS
+
+import tiktoken
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-CostEstimator---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class CostEstimator:
+
+    """
+
+    CostEstimator counts tokens (or characters) locally and estimates the cost of a translation, the same way EasyTL.calculate_cost does.
+    Counts are cached by a hash of the text and the encoding rather than the model or instructions, so estimating the same text again, even under different settings, doesn't tokenize it again.
+    Counts of large texts are also kept on disk, so they survive between runs.
+
+    """
+
+    ## models without a date (or version) are priced as the version EasyTL assumes they point to
+    MODEL_ALIASES = {
+        "gpt-3.5-turbo": "gpt-3.5-turbo-0125",
+        "gpt-3.5-turbo-16k": "gpt-3.5-turbo-16k-0613",
+        "gpt-4": "gpt-4-0613",
+        "gpt-4-32k": "gpt-4-32k-0613",
+        "gpt-4-turbo": "gpt-4-turbo-2024-04-09",
+        "gpt-4-turbo-preview": "gpt-4-0125-preview",
+        "gpt-4-vision-preview": "gpt-4-1106-vision-preview",
+        "gpt-4o": "gpt-4o-2024-08-06",
+        "gpt-4o-mini": "gpt-4o-mini-2024-07-18",
+        "o1-preview": "o1-preview-2024-09-12",
+        "o1-mini": "o1-mini-2024-09-12",
+        "o1": "o1-2024-12-17",
+        "gemini-pro": "gemini-1.0-pro-001",
+        "gemini-1.0-pro-latest": "gemini-1.0-pro-001",
+        "gemini-1.5-pro-latest": "gemini-1.5-pro-002",
+        "gemini-1.5-flash-latest": "gemini-1.5-flash-002"
+    }
+
+    ## versions EasyTL has no pricing for, priced as a version it does have that costs the same
+    PRICE_ALIASES = {
+        "o1-2024-12-17": "o1-2024-09-12"
+    }
+
+    ## price per million characters
+    CHARACTER_COSTS = {
+        "deepl": 25.0,
+        "google translate": 20.0,
+        "mock": 0.0
+    }
+
+    ## gemini's tokenizer isn't available offline, EasyTL counts it with this one as well
+    DEFAULT_ENCODING = "cl100k_base"
+
+    ## EasyTL can only guess how a plain list of lines will be split into messages for openai, so it pads the estimate
+    OPENAI_LINES_COST_MODIFIER = 2.5
+
+    ## texts at least this long have their counts kept on disk, shorter ones (instructions, batches) are cheap to count again
+    MIN_PERSISTED_LENGTH = 10000
+
+    MAX_CACHED_COUNTS = 10000
+    MAX_PERSISTED_COUNTS = 200
+
+    ## encoding name -> encoding, None if it couldn't be loaded (tiktoken downloads them the first time they are used)
+    encodings:typing.Dict[str, typing.Optional[tiktoken.Encoding]] = {}
+
+    ## hash of the text and the encoding -> count, oldest first
+    counts:typing.Dict[str, int] = {}
+    persisted_counts:typing.Optional[typing.Dict[str, int]] = None
+
+    ## guards the caches, the estimate of a whole text is counted in a thread while batches are counted for the rate limits
+    cache_lock = threading.Lock()
+
+##-------------------start-of-get_encoding_name()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_encoding_name(service:str, model:typing.Optional[str]=None) -> str:
+
+        """
+
+        Gets the name of the encoding a service's text is counted in.
+
+        Parameters:
+        service (str) : The translation method.
+        model (str | optional | default=None) : The model.
+
+        Returns:
+        (str) : The encoding name, or "characters" for the services billed by character.
+
+        """
+
+        if(service in CostEstimator.CHARACTER_COSTS):
+            return "characters"
+
+        if(service == "openai" and model is not None):
+            try:
+                return tiktoken.encoding_name_for_model(CostEstimator.MODEL_ALIASES.get(model, model))
+
+            except KeyError:
+                pass
+
+        return CostEstimator.DEFAULT_ENCODING
+
+##-------------------start-of-get_encoding()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_encoding(encoding_name:str) -> typing.Optional[tiktoken.Encoding]:
+
+        """
+
+        Loads an encoding once.
+
+        Parameters:
+        encoding_name (str) : The encoding name.
+
+        Returns:
+        (tiktoken.Encoding | None) : The encoding, None if it isn't available (never downloaded and no connection).
+
+        """
+
+        if(encoding_name not in CostEstimator.encodings):
+
+            try:
+                CostEstimator.encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+
+            except Exception as e:
+                logging.warning(f"Could not load the {encoding_name} tokenizer ({e}), token counts will be approximated.")
+                CostEstimator.encodings[encoding_name] = None
+
+        return CostEstimator.encodings[encoding_name]
+
+##-------------------start-of-approximate_token_count()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def approximate_token_count(text:str) -> int:
+
+        """
+
+        Approximates a token count without a tokenizer, about one token per Japanese character and one per four ASCII characters.
+
+        Parameters:
+        text (str) : The text.
+
+        Returns:
+        (int) : The approximate number of tokens.
+
+        """
+
+        num_ascii_characters = len(text.encode('ascii', errors='ignore'))
+
+        return (len(text) - num_ascii_characters) + (num_ascii_characters + 3) // 4
+
+##-------------------start-of-count()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def count(text:str, encoding_name:str, use_cache:bool=True) -> int:
+
+        """
+
+        Counts the tokens (or characters) of a text.
+
+        Parameters:
+        text (str) : The text.
+        encoding_name (str) : The encoding name, from get_encoding_name().
+        use_cache (bool | optional | default=True) : Whether to look the count up in (and add it to) the cache, not worth it for text that is only counted once.
+
+        Returns:
+        (int) : The count.
+
+        """
+
+        if(encoding_name == "characters"):
+            return len(text)
+
+        encoding = CostEstimator.get_encoding(encoding_name)
+
+        if(not use_cache):
+            return len(encoding.encode_ordinary(text)) if encoding is not None else CostEstimator.approximate_token_count(text)
+
+        ## approximate counts are kept apart, so they are redone once the tokenizer is available
+        key = f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}:{encoding_name if encoding is not None else 'approximate'}"
+
+        with CostEstimator.cache_lock:
+            count = CostEstimator.counts.pop(key, None)
+
+            if(count is None and len(text) >= CostEstimator.MIN_PERSISTED_LENGTH):
+                count = CostEstimator.load_persisted_counts().get(key)
+
+        ## the lock isn't held while counting, that's the slow part
+        is_new_count = count is None
+
+        if(count is None):
+            count = len(encoding.encode_ordinary(text)) if encoding is not None else CostEstimator.approximate_token_count(text)
+
+        with CostEstimator.cache_lock:
+
+            if(is_new_count and len(text) >= CostEstimator.MIN_PERSISTED_LENGTH):
+                CostEstimator.persist_count(key, count)
+
+            ## re-inserted so the dict stays in least recently used order
+            CostEstimator.counts[key] = count
+
+            if(len(CostEstimator.counts) > CostEstimator.MAX_CACHED_COUNTS):
+                CostEstimator.counts.pop(next(iter(CostEstimator.counts)))
+
+        return count
+
+##-------------------start-of-count_tokens()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def count_tokens(text:str, model:typing.Optional[str]=None, use_cache:bool=True) -> int:
+
+        """
+
+        Counts the tokens of a text, with the tokenizer of the openai model given or the default one.
+
+        Parameters:
+        text (str) : The text.
+        model (str | optional | default=None) : The openai model, None for the default encoding.
+        use_cache (bool | optional | default=True) : Whether to use the cache, see count().
+
+        Returns:
+        (int) : The number of tokens.
+
+        """
+
+        return CostEstimator.count(text, CostEstimator.get_encoding_name("openai", model), use_cache=use_cache)
+
+##-------------------start-of-estimate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def estimate(text:typing.Union[str, typing.Iterable[str]], service:str, model:typing.Optional[str]=None, translation_instructions:typing.Optional[str]=None) -> typing.Tuple[int, float, str]:
+
+        """
+
+        Estimates the cost of translating a text, a local and cached version of EasyTL.calculate_cost.
+
+        Parameters:
+        text (str | iterable[str]) : The text, or its lines.
+        service (str) : The translation method.
+        model (str | optional | default=None) : The model, ignored for deepl and google translate.
+        translation_instructions (str | optional | default=None) : The instructions, ignored for deepl and google translate.
+
+        Returns:
+        num_entities (int) : The number of tokens, or characters for deepl and google translate.
+        cost (float) : The estimated minimum cost, in USD.
+        model (str) : The model, or the service for deepl and google translate.
+
+        """
+
+        is_lines = not isinstance(text, str)
+        lines = list(text) if is_lines else [text]
+
+        joined_text = "".join(lines)
+
+        if(service in CostEstimator.CHARACTER_COSTS):
+            num_characters = len(joined_text)
+
+            return num_characters, (num_characters / 1000000) * CostEstimator.CHARACTER_COSTS[service], service
+
+        encoding_name = CostEstimator.get_encoding_name(service, model)
+
+        num_instruction_tokens = CostEstimator.count(translation_instructions or "", encoding_name)
+
+        ## gemini pairs the instructions with every line
+        if(service == "gemini" and is_lines):
+            num_instruction_tokens *= len(lines)
+
+        ## the instructions and the text are separated by a newline
+        num_tokens = num_instruction_tokens + 1 + CostEstimator.count(joined_text, encoding_name)
+
+        priced_model = CostEstimator.MODEL_ALIASES.get(model, model) if model is not None else None
+
+        cost_details = MODEL_COSTS.get(CostEstimator.PRICE_ALIASES.get(priced_model, priced_model)) if priced_model is not None else None
+
+        if(cost_details is None):
+            logging.warning(f"No pricing is known for {model}, the cost estimate will be 0.")
+            return num_tokens, 0.0, model or service
+
+        cost = (num_tokens / 1000) * (cost_details["_input_cost"] + cost_details["_output_cost"])
+
+        if(service == "openai" and is_lines):
+            cost *= CostEstimator.OPENAI_LINES_COST_MODIFIER
+
+        return num_tokens, cost, model # type: ignore
+
+##-------------------start-of-load_persisted_counts()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def load_persisted_counts() -> typing.Dict[str, int]:
+
+        """
+
+        Loads the counts kept on disk, once.
+
+        Returns:
+        (dict) : Hash of the text and the encoding -> count.
+
+        """
+
+        if(CostEstimator.persisted_counts is None):
+
+            try:
+                with open(FileEnsurer.token_count_cache_path, 'r', encoding='utf-8') as file:
+                    CostEstimator.persisted_counts = json.load(file)
+
+            except (FileNotFoundError, json.JSONDecodeError):
+                CostEstimator.persisted_counts = {}
+
+        return CostEstimator.persisted_counts # type: ignore
+
+##-------------------start-of-persist_count()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def persist_count(key:str, count:int) -> None:
+
+        """
+
+        Keeps a count on disk, dropping the oldest once there are too many.
+
+        Parameters:
+        key (str) : Hash of the text and the encoding.
+        count (int) : The count.
+
+        """
+
+        persisted_counts = CostEstimator.load_persisted_counts()
+
+        persisted_counts[key] = count
+
+        while(len(persisted_counts) > CostEstimator.MAX_PERSISTED_COUNTS):
+            persisted_counts.pop(next(iter(persisted_counts)))
+
+        try:
+            FileEnsurer.standard_create_directory(os.path.dirname(FileEnsurer.token_count_cache_path))
+
+            with open(FileEnsurer.token_count_cache_path, 'w', encoding='utf-8') as file:
+                json.dump(persisted_counts, file)
+
+        except OSError as e:
+            logging.warning(f"Could not save the token count cache: {e}")
@@ -1,7 +1,7 @@
 ## third-party libraries
 ## for importing, other scripts will use from common.exceptions instead of from the third-party libraries themselves
 from easytl import OpenAIAuthenticationError, OpenAIInternalServerError, OpenAIRateLimitError, OpenAIAPITimeoutError, OpenAIAPIConnectionError, OpenAIAPIStatusError
-from easytl import DeepLAuthorizationException, DeepLQuotaExceededException, DeepLException
+from easytl import DeepLAuthorizationException, DeepLQuotaExceededException, DeepLException, DeepLTooManyRequestsException
 from easytl import GoogleAuthError, GoogleAPIError
 
 ##-------------------start-of-KudasaiException--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -86,4 +86,31 @@ class TooManyFileAccessAttemptsException(KudasaiException):
 
         """
 
-        self.message = message
\ No newline at end of file
+        self.message = message
+
+##-------------------start-of-MockProviderError--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class MockProviderError(KudasaiException):
+
+    """
+
+    MockProviderError is an exception that is raised by the mock translation method, to stand in for the errors of a real service.
+
+    """
+
+    def __init__(self, message:str, status_code:int) -> None:
+
+        """
+
+        Parameters:
+        message (string) : The message to display.
+        status_code (int) : The HTTP status code it stands in for, e.g. 429.
+
+        """
+
+        self.message = message
+        self.status_code = status_code
+
+    def __str__(self) -> str:
+
+        return f"{self.status_code}: {self.message}"
\ No newline at end of file
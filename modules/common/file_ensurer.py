@@ -54,6 +54,20 @@ class FileEnsurer():
     kairyou_log_path = os.path.join(output_dir, "preprocessing_results.txt")  
     error_log_path = os.path.join(output_dir, "error_log.txt") 
     debug_log_path = os.path.join(output_dir, "debug_log.txt") 
+
+    ## record of the completed batches of the current translation run, used by --resume
+    translation_journal_path = os.path.join(output_dir, "translation_journal.jsonl")
+
+    ## the first batches of a translation run, written as soon as they are done, see preview_batch_count
+    preview_text_path = os.path.join(output_dir, "preview_text.txt")
+
+    ## per-batch metrics of the last translation run, as json lines and as a prometheus snapshot
+    batch_metrics_path = os.path.join(output_dir, "batch_metrics.jsonl")
+    batch_metrics_prometheus_path = os.path.join(output_dir, "batch_metrics.prom")
+
+    ## the requests of an openai batch job, and the id of the job once submitted, see openai_use_batch_api
+    batch_job_path = os.path.join(output_dir, "batch_job.jsonl")
+    batch_job_state_path = os.path.join(output_dir, "batch_job_state.json")
  
     ## translation settings
     external_translation_settings_path = os.path.join(script_dir,'translation_settings.json')
@@ -62,6 +76,16 @@ class FileEnsurer():
     external_translation_genders_path = os.path.join(script_dir,'genders.json')
     config_translation_genders_path = os.path.join(config_dir, 'genders.json')
 
+    ## settings of the mock translation method, see MockProvider
+    mock_provider_settings_path = os.path.join(script_dir, 'mock_provider_settings.json')
+
+    ## translation memory
+    translation_memory_path = os.path.join(config_dir, 'translation_memory.db')
+    line_memory_path = os.path.join(config_dir, 'line_memory.db')
+
+    ## token counts of previously estimated texts
+    token_count_cache_path = os.path.join(config_dir, 'token_count_cache.json')
+
     ## api keys
     deepl_api_key_path = os.path.join(secrets_dir, "deepl_api_key.txt")
     openai_api_key_path = os.path.join(secrets_dir,'openai_api_key.txt')
@@ -92,6 +116,17 @@ class FileEnsurer():
         "number_of_concurrent_batches": 5,
         "gender_context_insertion": False,
         "is_cote": False,
+        "use_translation_memory": False,
+        "use_line_memory": False,
+        "use_adaptive_concurrency": False,
+        "number_of_tokens_per_batch": None,
+        "bisect_malformed_batches": True,
+        "failover_translation_method": None,
+        "failover_after_seconds": 60,
+        "hedge_slow_requests": False,
+        "max_hedged_request_fraction": 0.1,
+        "priority_batch_range": None,
+        "preview_batch_count": 10
     },
 
     "openai settings": {
@@ -105,7 +140,11 @@ class FileEnsurer():
         "openai_logit_bias": None,
         "openai_max_tokens": None,
         "openai_presence_penalty": 0.0,
-        "openai_frequency_penalty": 0.0
+        "openai_frequency_penalty": 0.0,
+        "openai_requests_per_minute": None,
+        "openai_tokens_per_minute": None,
+        "openai_use_batch_api": False,
+        "openai_batch_poll_seconds": 60
     },
 
     "gemini settings": {
@@ -117,7 +156,9 @@ class FileEnsurer():
         "gemini_candidate_count": 1,
         "gemini_stream": False,
         "gemini_stop_sequences": None,
-        "gemini_max_output_tokens": None
+        "gemini_max_output_tokens": None,
+        "gemini_requests_per_minute": None,
+        "gemini_tokens_per_minute": None
     },
 
     "deepl settings":{
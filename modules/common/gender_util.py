@@ -1,4 +1,5 @@
 ## built-in libraries
+import os
 import json
 import typing
 import regex
@@ -11,7 +12,18 @@ from modules.common.file_ensurer import FileEnsurer
 class GenderUtil:
 
     genders:typing.Optional[dict] = None
-    cache = {}
+
+    ## (name, is_cote) -> genders found by find_name_gender(), kept until the genders file changes
+    cache:typing.Dict[typing.Tuple[str, bool], typing.List[str]] = {}
+
+    ## every part (first name, last name...) of every name in the genders file, for discard_non_names()
+    name_parts:typing.Set[str] = set()
+
+    ## path, modification time and size of the genders file when it was loaded, it's only read again once they change
+    genders_file_signature:typing.Optional[typing.Tuple[str, int, int]] = None
+
+    ## bumped every time the genders file is read, so anything built from it knows to start over
+    genders_version:int = 0
 
     is_cote:bool = False
 
@@ -136,20 +148,32 @@ class GenderUtil:
 
         """
         
-        Loads the genders from the specified file path.
-
-        Parameters:
-        file_path (str) : The file
+        Loads the genders from the genders file, only reading it again if it has changed since it was last read (by its modification time and size).
+        The cache of name genders is cleared and genders_version is bumped when it is read again.
 
         Returns:
         (dict) : The loaded json.
 
         """
 
+        file_path = FileEnsurer.config_translation_genders_path
+        file_stat = os.stat(file_path)
+
+        genders_file_signature = (file_path, file_stat.st_mtime_ns, file_stat.st_size)
+
+        if(GenderUtil.genders is not None and genders_file_signature == GenderUtil.genders_file_signature):
+            return GenderUtil.genders
+
+        with open(file_path, 'r', encoding='utf-8') as file:
+            GenderUtil.genders = json.load(file)
+
+        GenderUtil.name_parts = {part for gender_names in GenderUtil.genders.values() for full_name in gender_names for part in full_name.split(' ')} # type: ignore
         GenderUtil.cache = {}
 
-        with open(FileEnsurer.config_translation_genders_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        GenderUtil.genders_file_signature = genders_file_signature
+        GenderUtil.genders_version += 1
+
+        return GenderUtil.genders # type: ignore
         
 ##-------------------start-of-discard_non_names()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -170,17 +194,10 @@ class GenderUtil:
 
         GenderUtil.genders = GenderUtil.load_genders()
 
+        ## a name is kept if any part of it matches any part of a name in the genders file
         new_names = [
             name for name in names
-            if any(
-                any(
-                    part == full_part
-                    for part in GenderUtil.honorific_stripper(name).split(' ')
-                    for full_part in full_name.split(' ')
-                )
-                for gender, gender_names in GenderUtil.genders.items()
-                for full_name, _ in gender_names.items()
-            )
+            if any(part in GenderUtil.name_parts for part in GenderUtil.honorific_stripper(name).split(' '))
         ]
 
         if(GenderUtil.is_cote):
@@ -296,8 +313,11 @@ class GenderUtil:
 
         GenderUtil.genders = GenderUtil.load_genders()
 
-        if(name in GenderUtil.cache):
-            return GenderUtil.cache[name]
+        ## the cote names below change the result
+        cache_key = (name, GenderUtil.is_cote)
+
+        if(cache_key in GenderUtil.cache):
+            return GenderUtil.cache[cache_key]
         
         honorific = GenderUtil.reverse_honorific_stripper(name)
         stripped_name = GenderUtil.honorific_stripper(name)
@@ -305,7 +325,7 @@ class GenderUtil:
         ## check if the name is predetermined
         if((stripped_name, honorific) in cote_predetermined and GenderUtil.is_cote):
             result = [cote_predetermined[(stripped_name, honorific)]]
-            GenderUtil.cache[name] = result
+            GenderUtil.cache[cache_key] = result
             return result
 
         ## this does an in operation
@@ -333,7 +353,7 @@ class GenderUtil:
             else:
                 result = ["Undetermined"]
 
-        GenderUtil.cache[name] = result
+        GenderUtil.cache[cache_key] = result
 
         return result
     
@@ -399,22 +419,65 @@ class GenderUtil:
         
         """
 
-        names_with_positions = GenderUtil.find_english_words(sample)
-        potential_names_with_positions = [(name, pos) for name, pos in names_with_positions if GenderUtil.is_potential_name(name)]
-        grouped_names = GenderUtil.group_names(sample, potential_names_with_positions)
-        actual_names = GenderUtil.discard_non_names(grouped_names)
-        filtered_names = GenderUtil.discard_similar_names(actual_names)
+        return GenderUtil.get_gender_assumption_for_names(sample, GenderUtil.find_potential_names(sample), {})
 
-        assumptions = [
-            "{} : {}\n".format(name, gender[0]) if gender and len(set(gender)) == 1 and gender not in ["Undetermined", "Unknown"] else "{} : Undetermined\n".format(name)
-            for name in filtered_names
-            for gender in [GenderUtil.find_name_gender(name)]
-        ]
+##----------------start-of-find_potential_names()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-        gender_assumptions = [
-            "{} : {}\n".format(name.strip(), gender.strip().replace("Unknown", "Undetermined"))
-            for assumption in assumptions
-            for name, gender in [assumption.split(":")]
-        ]
+    @staticmethod
+    def find_potential_names(sample:str) -> typing.List[typing.Tuple[str, int]]:
+
+        """
+
+        Finds the words of a text sample that could be (part of) a name.
+
+        Parameters:
+        sample (str) : The text to be analyzed.
+
+        Returns:
+        potential_names_with_positions (list[tuple[str, int]]) : The potential names and their starting index.
+
+        """
+
+        return [(name, position) for name, position in GenderUtil.find_english_words(sample) if GenderUtil.is_potential_name(name)]
+
+##----------------start-of-get_gender_assumption_for_names()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_gender_assumption_for_names(sample:str, names_with_positions:typing.List[typing.Tuple[str, int]], known_genders:typing.Dict[str, typing.Optional[str]]) -> typing.List[str]:
+
+        """
+
+        Gets the gender assumptions for a text sample whose potential names were already found, see find_potential_names().
+        Whether a name is in the genders file, and its gender, are only looked up the first time it's seen, later samples get them from known_genders.
+
+        Parameters:
+        sample (str) : The text to be analyzed.
+        names_with_positions (list[tuple[str, int]]) : The potential names of the sample and their starting index.
+        known_genders (dict) : Name -> gender assumption (None if it isn't a name), shared by the samples of a run and filled in as new names are seen. It has to be cleared when genders_version changes.
+
+        Returns:
+        genders (list[str]) : The gender assumptions.
+
+        """
+
+        grouped_names = GenderUtil.group_names(sample, names_with_positions)
+
+        new_names = [name for name in dict.fromkeys(grouped_names) if name not in known_genders]
+
+        if(len(new_names) > 0):
+            actual_names = set(GenderUtil.discard_non_names(new_names))
+
+            for name in new_names:
+
+                if(name not in actual_names):
+                    known_genders[name] = None
+                    continue
+
+                gender = GenderUtil.find_name_gender(name)
+                gender = gender[0] if gender and len(set(gender)) == 1 and gender not in ["Undetermined", "Unknown"] else "Undetermined"
+
+                known_genders[name] = "{} : {}\n".format(name.strip(), gender.strip().replace("Unknown", "Undetermined"))
+
+        filtered_names = GenderUtil.discard_similar_names([name for name in grouped_names if known_genders[name] is not None])
 
-        return gender_assumptions
\ No newline at end of file
+        return [known_genders[name] for name in filtered_names] # type: ignore
\ No newline at end of file
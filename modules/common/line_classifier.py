@@ -0,0 +1,94 @@
+## built-in libraries
+import re
+import array
+import typing
+
+## third-party libraries
+from kairyou import KatakanaUtil
+
+##-------------------start-of-LineClassifier---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class LineClassifier:
+
+    """
+
+    LineClassifier sorts every line of a text into skip, marker or content in a single pass, so batching, cost estimation and statistics don't each have to rescan the text.
+    The classes are stored in a compact array, one byte per line.
+
+    """
+
+    SKIP = 0
+    MARKER = 1
+    CONTENT = 2
+
+    ## pov changes (▼ △ ◇) and part markers, these are always kept even though they are mostly punctuation
+    _marker_pattern = re.compile(r"[▼△◇]|part", re.IGNORECASE)
+    _part_chars = ["１","２","３","４","５","６","７","８","９", " "]
+
+    _non_word_pattern = re.compile(r'^[\W_\s\n-]+$')
+    _punctuation_pattern = re.compile("[" + re.escape("".join(sorted(KatakanaUtil.PUNCTUATION_CHARSET))) + "]*")
+    _quote_pattern = re.compile(r"""[「」『』【】"']""")
+
+##-------------------start-of-classify()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def classify(lines:typing.List[str]) -> array.array:
+
+        """
+
+        Classifies every line of a text.
+
+        Parameters:
+        lines (list[str]) : The lines of the text.
+
+        Returns:
+        (array.array) : One class per line.
+
+        """
+
+        ## the patterns are bound locally as this runs once per line of the whole text
+        search_marker = LineClassifier._marker_pattern.search
+        match_non_word = LineClassifier._non_word_pattern.match
+        match_punctuation = LineClassifier._punctuation_pattern.fullmatch
+        search_quote = LineClassifier._quote_pattern.search
+        part_chars = LineClassifier._part_chars
+
+        line_classes = array.array('b', bytes(len(lines)))
+
+        for index, line in enumerate(lines):
+
+            sentence = line.strip()
+
+            if(not sentence):
+                continue
+
+            if(search_marker(sentence) or ("１" in sentence and all(char in sentence for char in part_chars))):
+                line_classes[index] = LineClassifier.MARKER
+
+            elif(not (match_non_word(sentence) or (match_punctuation(sentence) and not search_quote(sentence)))):
+                line_classes[index] = LineClassifier.CONTENT
+
+        return line_classes
+
+##-------------------start-of-get_statistics()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_statistics(line_classes:array.array) -> typing.Dict[str, int]:
+
+        """
+
+        Counts the lines of each class.
+
+        Parameters:
+        line_classes (array.array) : The classes made by classify().
+
+        Returns:
+        (dict[str, int]) : The number of skipped, marker and content lines.
+
+        """
+
+        return {
+            "skipped": line_classes.count(LineClassifier.SKIP),
+            "markers": line_classes.count(LineClassifier.MARKER),
+            "content": line_classes.count(LineClassifier.CONTENT)
+        }
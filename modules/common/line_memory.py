@@ -0,0 +1,526 @@
+## built-in libraries
+import os
+import time
+import array
+import typing
+import random
+import sqlite3
+import logging
+import unicodedata
+import zlib
+import threading
+import collections
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-LineMemory---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class LineMemory:
+
+    """
+
+    LineMemory is a line-level translation memory that remembers individual Japanese lines and their translations across runs.
+    Exact matches can be reused directly, while near-duplicates are found through a MinHash index over character n-grams so they can be sent to the model as hints.
+    Lines are remembered per translation method and model, and only match lines translated by the same ones.
+    Only a bounded number of the most recently used lines are indexed in memory, the rest stay on disk.
+    The public methods can be called from any thread, but only one runs at a time.
+
+    """
+
+    ## size of the character n-grams (shingles) lines are broken into, Japanese has no spaces so words are not an option
+    SHINGLE_SIZE = 3
+
+    ## minhash signature length, split into bands of 4 rows for locality sensitive hashing
+    NUM_PERMUTATIONS = 32
+    NUM_BANDS = 8
+
+    ## upper bound on how many candidates are verified per lookup, stock phrases can collide with a lot of lines
+    MAX_CANDIDATES = 200
+
+    ## lines shorter than this (after normalization) are too generic to be worth remembering, think 「……」 or ？
+    MIN_LINE_LENGTH = 4
+
+    ## how similar (jaccard over shingles) a remembered line has to be to count as a near-duplicate
+    SIMILARITY_THRESHOLD = 0.7
+
+    ## how many lines are kept on disk, and how many of the most recently used of those are indexed in memory
+    MAX_STORED_LINES = 500000
+    MAX_INDEXED_LINES = 100000
+
+    MAX_AGE_DAYS = 90
+
+    ## the largest mersenne prime that fits in 64 bits, used for the permutation hashes
+    _PRIME = (1 << 61) - 1
+
+    ## fixed seed so signatures stored in previous runs remain comparable
+    _permutation_seeds = random.Random(1337).sample(range(1, _PRIME), NUM_PERMUTATIONS * 2)
+    _permutations = list(zip(_permutation_seeds[::2], _permutation_seeds[1::2]))
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, translation_method:str, model:str, database_path:typing.Optional[str]=None) -> None:
+
+        """
+
+        Opens (or creates) the line memory database, evicts stale lines and builds the in-memory index.
+
+        Parameters:
+        translation_method (str) : The translation method lines are looked up and learned for.
+        model (str) : The model lines are looked up and learned for.
+        database_path (str | optional | default=None) : The path to the SQLite database, defaults to FileEnsurer.line_memory_path.
+
+        """
+
+        database_path = database_path or FileEnsurer.line_memory_path
+
+        FileEnsurer.standard_create_directory(os.path.dirname(database_path))
+
+        self.database_path = database_path
+
+        self.translation_method = translation_method
+        self.model = model
+
+        self.num_reused_lines = 0
+        self.num_hinted_lines = 0
+
+        ## band hash -> row ids of the lines sharing that band
+        self.buckets:typing.Dict[int, typing.List[int]] = {}
+        self.num_indexed_lines = 0
+
+        ## row ids of the indexed lines, least recently used first
+        self.indexed_rows:collections.OrderedDict[int, None] = collections.OrderedDict()
+
+        ## the lookups are run off the event loop, one at a time
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+        ## lines from before they were kept per method and model can't be told apart, so they are dropped
+        columns = [column[1] for column in self.connection.execute("PRAGMA table_info(lines)")]
+
+        if(columns and "model" not in columns):
+            logging.debug("Line memory predates per method and model lines, clearing it.")
+            self.connection.execute("DROP TABLE lines")
+
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS lines (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                translation_method TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                last_used_at REAL NOT NULL,
+                UNIQUE (source, translation_method, model)
+            )
+        """)
+
+        self.connection.execute("CREATE INDEX IF NOT EXISTS lines_last_used_at ON lines (last_used_at)")
+        self.connection.commit()
+
+        self.evict()
+
+        ## oldest first, so the most recently used lines end up at the back of indexed_rows
+        for row_id, signature in self.connection.execute("SELECT id, signature FROM (SELECT id, signature, last_used_at FROM lines WHERE translation_method = ? AND model = ? ORDER BY last_used_at DESC LIMIT ?) ORDER BY last_used_at", (translation_method, model, LineMemory.MAX_INDEXED_LINES)):
+            sig = array.array('Q')
+            sig.frombytes(signature)
+            self.index_signature(row_id, sig)
+
+        logging.debug(f"Line memory loaded, {self.num_indexed_lines} lines indexed.")
+
+##-------------------start-of-normalize()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def normalize(line:str) -> str:
+
+        """
+
+        Normalizes a line so trivially different copies (full-width vs half-width, spacing) compare equal.
+
+        Parameters:
+        line (str) : The line to normalize.
+
+        Returns:
+        (str) : The normalized line.
+
+        """
+
+        return "".join(unicodedata.normalize("NFKC", line).split())
+
+##-------------------start-of-get_shingles()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_shingles(normalized_line:str) -> typing.Set[str]:
+
+        """
+
+        Breaks a normalized line into its character n-grams.
+
+        Parameters:
+        normalized_line (str) : The normalized line.
+
+        Returns:
+        (set[str]) : The shingles.
+
+        """
+
+        if(len(normalized_line) <= LineMemory.SHINGLE_SIZE):
+            return {normalized_line}
+
+        return {normalized_line[i:i + LineMemory.SHINGLE_SIZE] for i in range(len(normalized_line) - LineMemory.SHINGLE_SIZE + 1)}
+
+##-------------------start-of-get_signature()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_signature(shingles:typing.Set[str]) -> array.array:
+
+        """
+
+        Computes the minhash signature of a set of shingles.
+
+        Parameters:
+        shingles (set[str]) : The shingles of a line.
+
+        Returns:
+        signature (array.array) : The minhash signature, one unsigned 64 bit value per permutation.
+
+        """
+
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+        prime = LineMemory._PRIME
+
+        return array.array('Q', (min((a * h + b) % prime for h in hashes) for a, b in LineMemory._permutations))
+
+##-------------------start-of-get_band_hashes()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_band_hashes(signature:array.array) -> typing.List[int]:
+
+        """
+
+        Splits a signature into bands and hashes each, lines sharing any band hash are candidates for each other.
+
+        Parameters:
+        signature (array.array) : The minhash signature.
+
+        Returns:
+        (list[int]) : One hash per band.
+
+        """
+
+        rows_per_band = LineMemory.NUM_PERMUTATIONS // LineMemory.NUM_BANDS
+
+        return [hash((band, tuple(signature[band * rows_per_band:(band + 1) * rows_per_band]))) for band in range(LineMemory.NUM_BANDS)]
+
+##-------------------start-of-index_signature()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def index_signature(self, row_id:int, signature:array.array) -> None:
+
+        """
+
+        Adds a stored line to the in-memory index, or marks it as recently used if it's already in there.
+        If the index is full, the least recently used line is dropped from it to make room.
+
+        Parameters:
+        row_id (int) : The id of the line in the database.
+        signature (array.array) : The minhash signature of the line.
+
+        """
+
+        if(row_id in self.indexed_rows):
+            self.indexed_rows.move_to_end(row_id)
+            return
+
+        if(self.num_indexed_lines >= LineMemory.MAX_INDEXED_LINES):
+            self.unindex_signature(self.indexed_rows.popitem(last=False)[0])
+
+        for band_hash in LineMemory.get_band_hashes(signature):
+            self.buckets.setdefault(band_hash, []).append(row_id)
+
+        self.indexed_rows[row_id] = None
+        self.num_indexed_lines += 1
+
+##-------------------start-of-unindex_signature()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def unindex_signature(self, row_id:int) -> None:
+
+        """
+
+        Removes a line from the in-memory index, it stays on disk.
+
+        Parameters:
+        row_id (int) : The id of the line in the database.
+
+        """
+
+        ## the band hashes aren't kept per line, so they are worked out again from the stored signature
+        signature = array.array('Q')
+        signature.frombytes(self.connection.execute("SELECT signature FROM lines WHERE id = ?", (row_id,)).fetchone()[0])
+
+        for band_hash in LineMemory.get_band_hashes(signature):
+
+            bucket = self.buckets[band_hash]
+            bucket.remove(row_id)
+
+            if(not bucket):
+                del self.buckets[band_hash]
+
+        self.num_indexed_lines -= 1
+
+##-------------------start-of-find_match()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def find_match(self, line:str, allow_similar:bool=True) -> typing.Optional[typing.Tuple[int, str, str, float]]:
+
+        """
+
+        Finds the remembered line most similar to the given one, without marking it as used.
+
+        Parameters:
+        line (str) : The Japanese line to look up.
+        allow_similar (bool | optional | default=True) : Whether near-duplicates count, if False only an exact match is returned.
+
+        Returns:
+        (tuple[int, str, str, float] | None) : The id of the remembered line, its source, its translation and the similarity (1.0 for an exact match), or None if nothing is similar enough.
+
+        """
+
+        normalized_line = LineMemory.normalize(line)
+
+        if(len(normalized_line) < LineMemory.MIN_LINE_LENGTH):
+            return None
+
+        row = self.connection.execute("SELECT id, source, translation FROM lines WHERE source = ? AND translation_method = ? AND model = ?", (normalized_line, self.translation_method, self.model)).fetchone()
+
+        if(row is not None):
+            return row[0], row[1], row[2], 1.0
+
+        if(not allow_similar):
+            return None
+
+        shingles = LineMemory.get_shingles(normalized_line)
+
+        candidate_ids = list({row_id for band_hash in LineMemory.get_band_hashes(LineMemory.get_signature(shingles)) for row_id in self.buckets.get(band_hash, [])})[:LineMemory.MAX_CANDIDATES]
+
+        if(not candidate_ids):
+            return None
+
+        best_match = None
+
+        ## signatures only estimate similarity, so the real jaccard is computed for the (few) candidates
+        placeholders = ",".join("?" * len(candidate_ids))
+
+        for row_id, source, translation in self.connection.execute(f"SELECT id, source, translation FROM lines WHERE id IN ({placeholders})", tuple(candidate_ids)):
+
+            candidate_shingles = LineMemory.get_shingles(source)
+            similarity = len(shingles & candidate_shingles) / len(shingles | candidate_shingles)
+
+            if(similarity >= LineMemory.SIMILARITY_THRESHOLD and (best_match is None or similarity > best_match[3])):
+                best_match = (row_id, source, translation, similarity)
+
+        return best_match
+
+##-------------------start-of-mark_used()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def mark_used(self, row_ids:typing.List[int]) -> None:
+
+        """
+
+        Marks lines that were served as just used, both on disk (so they are the last to expire or be evicted) and in the index (so they are the last to be dropped from it).
+        Done in a single write, so it should be called once per batch rather than per line.
+
+        Parameters:
+        row_ids (list[int]) : The ids of the lines that were served.
+
+        """
+
+        row_ids = list(dict.fromkeys(row_ids))
+
+        if(not row_ids):
+            return
+
+        placeholders = ",".join("?" * len(row_ids))
+
+        self.connection.execute(f"UPDATE lines SET last_used_at = ? WHERE id IN ({placeholders})", (time.time(), *row_ids))
+        self.connection.commit()
+
+        unindexed_ids = [row_id for row_id in row_ids if row_id not in self.indexed_rows]
+
+        for row_id in row_ids:
+            if(row_id in self.indexed_rows):
+                self.indexed_rows.move_to_end(row_id)
+
+        if(not unindexed_ids):
+            return
+
+        placeholders = ",".join("?" * len(unindexed_ids))
+
+        for row_id, signature_bytes in self.connection.execute(f"SELECT id, signature FROM lines WHERE id IN ({placeholders})", tuple(unindexed_ids)).fetchall():
+            signature = array.array('Q')
+            signature.frombytes(signature_bytes)
+            self.index_signature(row_id, signature)
+
+##-------------------start-of-lookup()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def lookup(self, line:str, allow_similar:bool=True) -> typing.Optional[typing.Tuple[str, str, float]]:
+
+        """
+
+        Finds the remembered line most similar to the given one, and marks it as used.
+
+        Parameters:
+        line (str) : The Japanese line to look up.
+        allow_similar (bool | optional | default=True) : Whether near-duplicates count, if False only an exact match is returned.
+
+        Returns:
+        (tuple[str, str, float] | None) : The remembered source line, its translation and the similarity (1.0 for an exact match), or None if nothing is similar enough.
+
+        """
+
+        with self.lock:
+            match = self.find_match(line, allow_similar=allow_similar)
+
+            if(match is None):
+                return None
+
+            self.mark_used([match[0]])
+
+            return match[1], match[2], match[3]
+
+##-------------------start-of-lookup_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def lookup_batch(self, lines:typing.List[str], collect_hints:bool=True) -> typing.Tuple[typing.Optional[str], typing.List[typing.Tuple[str, str]]]:
+
+        """
+
+        Looks up every line of a batch, marking the lines that are served as used.
+
+        Parameters:
+        lines (list[str]) : The non-blank Japanese lines of the batch.
+        collect_hints (bool | optional | default=True) : Whether to search for near-duplicates, if False only exact matches are looked for.
+
+        Returns:
+        reused_translation (str | None) : The assembled translation if every line had an exact match, otherwise None.
+        hints (list[tuple[str, str]]) : Remembered (source, translation) pairs for the lines that had a match.
+
+        """
+
+        with self.lock:
+            matches = [self.find_match(line, allow_similar=collect_hints) for line in lines]
+
+            if(lines and all(match is not None and match[3] == 1.0 for match in matches)):
+                self.num_reused_lines += len(lines)
+                self.mark_used([match[0] for match in matches]) # type: ignore
+                return "\n".join(match[2] for match in matches), [] # type: ignore
+
+            if(not collect_hints):
+                return None, []
+
+            hint_matches = [match for match in matches if match is not None]
+
+            self.num_hinted_lines += len(hint_matches)
+            self.mark_used([match[0] for match in hint_matches])
+
+            return None, [(match[1], match[2]) for match in hint_matches]
+
+##-------------------start-of-can_assemble()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def can_assemble(self, lines:typing.List[str]) -> bool:
+
+        """
+
+        Checks whether lookup_batch() would assemble a batch from memory, without counting its lines as reused or marking them as used.
+
+        Parameters:
+        lines (list[str]) : The non-blank Japanese lines of the batch.
+
+        Returns:
+        (bool) : True if every line has an exact match.
+
+        """
+
+        with self.lock:
+            return len(lines) > 0 and all(self.find_match(line, allow_similar=False) is not None for line in lines)
+
+##-------------------start-of-learn()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def learn(self, source_lines:typing.List[str], translated_lines:typing.List[str]) -> None:
+
+        """
+
+        Remembers the lines of a correctly translated batch, the two lists must be aligned line for line.
+        The batch should have been translated by the method and model of the memory.
+
+        Parameters:
+        source_lines (list[str]) : The non-blank Japanese lines of the batch.
+        translated_lines (list[str]) : The non-blank translated lines of the batch.
+
+        """
+
+        with self.lock:
+            now = time.time()
+
+            for source_line, translated_line in zip(source_lines, translated_lines):
+
+                normalized_line = LineMemory.normalize(source_line)
+
+                if(len(normalized_line) < LineMemory.MIN_LINE_LENGTH):
+                    continue
+
+                existing_row = self.connection.execute("SELECT id FROM lines WHERE source = ? AND translation_method = ? AND model = ?", (normalized_line, self.translation_method, self.model)).fetchone()
+
+                if(existing_row is not None):
+                    self.connection.execute("UPDATE lines SET translation = ?, last_used_at = ? WHERE id = ?", (translated_line.strip(), now, existing_row[0]))
+
+                    if(existing_row[0] in self.indexed_rows):
+                        self.indexed_rows.move_to_end(existing_row[0])
+
+                    else:
+                        self.index_signature(existing_row[0], LineMemory.get_signature(LineMemory.get_shingles(normalized_line)))
+
+                    continue
+
+                signature = LineMemory.get_signature(LineMemory.get_shingles(normalized_line))
+
+                cursor = self.connection.execute("INSERT INTO lines (source, translation_method, model, translation, signature, last_used_at) VALUES (?, ?, ?, ?, ?, ?)", (normalized_line, self.translation_method, self.model, translated_line.strip(), signature.tobytes(), now))
+
+                self.index_signature(cursor.lastrowid, signature) # type: ignore
+
+            self.connection.commit()
+
+##-------------------start-of-evict()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def evict(self) -> None:
+
+        """
+
+        Removes lines older than MAX_AGE_DAYS, then the least recently used lines past MAX_STORED_LINES.
+
+        """
+
+        cutoff = time.time() - LineMemory.MAX_AGE_DAYS * 86400
+
+        num_expired = self.connection.execute("DELETE FROM lines WHERE last_used_at < ?", (cutoff,)).rowcount
+
+        num_overflowing = self.connection.execute("""
+            DELETE FROM lines WHERE id IN (
+                SELECT id FROM lines ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (LineMemory.MAX_STORED_LINES,)).rowcount
+
+        self.connection.commit()
+
+        if(num_expired or num_overflowing):
+            logging.debug(f"Evicted {num_expired} expired and {num_overflowing} overflowing lines from the line memory.")
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        """
+
+        Closes the database connection.
+
+        """
+
+        with self.lock:
+            self.connection.close()
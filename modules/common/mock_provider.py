@@ -0,0 +1,324 @@
+## built-in libraries
+import json
+import time
+import hashlib
+import typing
+import random
+import asyncio
+import logging
+import collections
+
+## third-party libraries
+from easytl import Message
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+from modules.common.exceptions import MockProviderError
+
+##-------------------start-of-MockProvider---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class MockProvider:
+
+    """
+
+    MockProvider is an in-process stand-in for a translation service, used as the "mock" translation method to run and benchmark the translator without an API key, a connection or a bill.
+    It has the same shape as EasyTL's *_translate_async functions, and can be set up to be slow, rate limited, unreliable or malformed.
+
+    Whether a request is slow, rejected or malformed is drawn from a random generator seeded by the seed, the text and how many times that text was sent, so a run behaves the same no matter the order batches are sent in.
+    Only the throughput caps (requests_per_minute, max_concurrent_requests) depend on timing, like a real service.
+
+    """
+
+    DEFAULT_SETTINGS:typing.Dict[str, typing.Any] = {
+
+        "seed": 0,
+
+        ## constant, uniform (mean +- mean * spread), exponential or lognormal (spread is the sigma)
+        "latency_distribution": "lognormal",
+        "mean_latency": 1.0,
+        "latency_spread": 0.5,
+
+        ## added to the latency per character of the request, a throughput cap on large batches
+        "seconds_per_character": 0.0,
+
+        ## stragglers, for hedging
+        "slow_request_probability": 0.0,
+        "slow_request_latency": 30.0,
+
+        ## injected errors, a 429 comes back immediately while a 500 comes back after the latency
+        "rate_limit_probability": 0.0,
+        "server_error_probability": 0.0,
+
+        ## responses with a line missing, which fail the line count check
+        "malformed_probability": 0.0,
+
+        ## requests over these are rejected with a 429, None for no cap
+        "requests_per_minute": None,
+        "max_concurrent_requests": None
+
+    }
+
+    settings:typing.Dict[str, typing.Any] = dict(DEFAULT_SETTINGS)
+
+    ## hash of the text -> how many times it has been sent, hashed as the texts themselves would add up over a long run
+    attempts:typing.Dict[bytes, int] = {}
+
+    ## when the requests of the last minute were accepted, for requests_per_minute
+    request_times:typing.Deque[float] = collections.deque()
+
+    in_flight = 0
+    peak_in_flight = 0
+
+    num_requests = 0
+    num_rate_limited = 0
+    num_server_errors = 0
+    num_malformed = 0
+
+##-------------------start-of-configure()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def configure(**settings:typing.Any) -> None:
+
+        """
+
+        Sets up the mock from the defaults and the settings given, and resets its state.
+
+        Parameters:
+        **settings (any) : Settings to override, see DEFAULT_SETTINGS.
+
+        """
+
+        unknown_settings = set(settings) - set(MockProvider.DEFAULT_SETTINGS)
+
+        if(len(unknown_settings) > 0):
+            raise ValueError(f"Unknown mock provider settings : {', '.join(sorted(unknown_settings))}")
+
+        if(settings.get("latency_distribution", "constant") not in ["constant", "uniform", "exponential", "lognormal"]):
+            raise ValueError(f"Unknown latency distribution : {settings['latency_distribution']}")
+
+        MockProvider.settings = {**MockProvider.DEFAULT_SETTINGS, **settings}
+
+        MockProvider.reset()
+
+##-------------------start-of-load_settings()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def load_settings(settings_path:typing.Optional[str]=None) -> None:
+
+        """
+
+        Sets up the mock from a json file of settings, or the defaults if there isn't one.
+
+        Parameters:
+        settings_path (str | optional | default=None) : The path to the json file, defaults to FileEnsurer.mock_provider_settings_path.
+
+        """
+
+        settings_path = settings_path or FileEnsurer.mock_provider_settings_path
+
+        try:
+            with open(settings_path, 'r', encoding='utf-8') as file:
+                settings = json.load(file)
+
+            logging.info(f"Loaded mock provider settings from {settings_path}.")
+
+        except FileNotFoundError:
+            settings = {}
+
+        MockProvider.configure(**settings)
+
+        logging.debug(f"Mock provider settings : {MockProvider.settings}")
+
+##-------------------start-of-reset()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def reset() -> None:
+
+        """
+
+        Resets the state and statistics of the mock, keeping its settings.
+
+        """
+
+        MockProvider.attempts = {}
+        MockProvider.request_times = collections.deque()
+
+        MockProvider.in_flight = 0
+        MockProvider.peak_in_flight = 0
+
+        MockProvider.num_requests = 0
+        MockProvider.num_rate_limited = 0
+        MockProvider.num_server_errors = 0
+        MockProvider.num_malformed = 0
+
+##-------------------start-of-draw_latency()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def draw_latency(rng:random.Random, text:str) -> float:
+
+        """
+
+        Draws how long a request takes.
+
+        Parameters:
+        rng (random.Random) : The generator of the request.
+        text (str) : The text of the request.
+
+        Returns:
+        (float) : The latency, in seconds.
+
+        """
+
+        settings = MockProvider.settings
+
+        mean_latency = float(settings["mean_latency"])
+        spread = float(settings["latency_spread"])
+
+        if(rng.random() < settings["slow_request_probability"]):
+            latency = float(settings["slow_request_latency"])
+
+        elif(settings["latency_distribution"] == "uniform"):
+            latency = rng.uniform(mean_latency * (1 - spread), mean_latency * (1 + spread))
+
+        elif(settings["latency_distribution"] == "exponential"):
+            latency = rng.expovariate(1 / mean_latency) if mean_latency > 0 else 0.0
+
+        elif(settings["latency_distribution"] == "lognormal"):
+            ## mu is picked so the mean of the distribution is mean_latency
+            latency = rng.lognormvariate(0, spread) * mean_latency / (2.718281828459045 ** (spread ** 2 / 2))
+
+        else:
+            latency = mean_latency
+
+        return max(0.0, latency) + len(text) * float(settings["seconds_per_character"])
+
+##-------------------start-of-check_throughput()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def check_throughput() -> None:
+
+        """
+
+        Rejects a request that would go over the requests per minute or concurrency caps.
+
+        """
+
+        settings = MockProvider.settings
+
+        now = time.monotonic()
+
+        while(MockProvider.request_times and now - MockProvider.request_times[0] >= 60):
+            MockProvider.request_times.popleft()
+
+        if(settings["requests_per_minute"] is not None and len(MockProvider.request_times) >= settings["requests_per_minute"]):
+            MockProvider.num_rate_limited += 1
+            raise MockProviderError("Rate limit reached for requests per minute.", 429)
+
+        if(settings["max_concurrent_requests"] is not None and MockProvider.in_flight >= settings["max_concurrent_requests"]):
+            MockProvider.num_rate_limited += 1
+            raise MockProviderError("Too many concurrent requests.", 429)
+
+        MockProvider.request_times.append(now)
+
+##-------------------start-of-translate_line()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def translate_line(line:str) -> str:
+
+        """
+
+        "Translates" a line, keeping the source so the output can still be checked against it.
+
+        Parameters:
+        line (str) : The line.
+
+        Returns:
+        (str) : The translated line.
+
+        """
+
+        return f"[mock] {line.strip()}"
+
+##-------------------start-of-handle_request()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def handle_request(text:str) -> str:
+
+        """
+
+        Serves a single request.
+
+        Parameters:
+        text (str) : The text to translate.
+
+        Returns:
+        (str) : The translated text, one line per line of text unless it is malformed.
+
+        """
+
+        settings = MockProvider.settings
+
+        MockProvider.num_requests += 1
+
+        text_key = hashlib.sha256(text.encode('utf-8')).digest()
+
+        attempt = MockProvider.attempts.get(text_key, 0)
+        MockProvider.attempts[text_key] = attempt + 1
+
+        rng = random.Random(f"{settings['seed']}:{attempt}:{text}")
+
+        if(rng.random() < settings["rate_limit_probability"]):
+            MockProvider.num_rate_limited += 1
+            raise MockProviderError("Rate limit reached.", 429)
+
+        MockProvider.check_throughput()
+
+        MockProvider.in_flight += 1
+        MockProvider.peak_in_flight = max(MockProvider.peak_in_flight, MockProvider.in_flight)
+
+        try:
+            await asyncio.sleep(MockProvider.draw_latency(rng, text))
+
+        finally:
+            MockProvider.in_flight -= 1
+
+        if(rng.random() < settings["server_error_probability"]):
+            MockProvider.num_server_errors += 1
+            raise MockProviderError("The server had an error while processing your request.", 500)
+
+        translated_lines = [MockProvider.translate_line(line) for line in text.split('\n') if line.strip()]
+
+        if(len(translated_lines) > 1 and rng.random() < settings["malformed_probability"]):
+            MockProvider.num_malformed += 1
+            translated_lines.pop(rng.randrange(len(translated_lines)))
+
+        return '\n'.join(translated_lines)
+
+##-------------------start-of-translate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def translate_async(text:typing.Union[str, Message], decorator:typing.Optional[typing.Callable]=None, **kwargs) -> str:
+
+        """
+
+        Translates text, the mock counterpart of EasyTL's *_translate_async functions.
+
+        Parameters:
+        text (str | Message) : The text to translate.
+        decorator (callable | optional | default=None) : Wraps the request, e.g. a backoff decorator, same as EasyTL.
+        **kwargs (any) : Any other parameter of a real translation method, ignored.
+
+        Returns:
+        (str) : The translated text.
+
+        """
+
+        content = text.content if isinstance(text, Message) else text
+
+        async def send_request() -> str:
+            return await MockProvider.handle_request(content)
+
+        if(decorator is not None):
+            return await decorator(send_request)()
+
+        return await send_request()
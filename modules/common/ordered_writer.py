@@ -0,0 +1,117 @@
+## built-in libraries
+import os
+import typing
+import logging
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-OrderedWriter---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class OrderedWriter:
+
+    """
+
+    OrderedWriter is a reorder buffer for batches that finish out of order.
+    Batches are held until every batch before them is done, then released in order so the translated text and j-e check text can be written as the run goes.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, first_batch_number:int=1, translated_text_path:typing.Optional[str]=None, je_check_path:typing.Optional[str]=None) -> None:
+
+        """
+
+        Opens (and truncates) the output files.
+
+        Parameters:
+        first_batch_number (int | optional | default=1) : The number of the first batch.
+        translated_text_path (str | optional | default=None) : The path to the translated text, defaults to FileEnsurer.translated_text_path.
+        je_check_path (str | optional | default=None) : The path to the j-e check text, defaults to FileEnsurer.je_check_path.
+
+        """
+
+        translated_text_path = translated_text_path or FileEnsurer.translated_text_path
+        je_check_path = je_check_path or FileEnsurer.je_check_path
+
+        ## the paths don't have to be in the default output directory
+        for path in [translated_text_path, je_check_path]:
+            FileEnsurer.standard_create_directory(os.path.dirname(os.path.abspath(path)))
+
+        self.next_batch_number = first_batch_number
+
+        ## batch number -> result, for the batches that finished before the ones preceding them
+        self.pending:typing.Dict[int, typing.Any] = {}
+
+        ## the largest the out of order window got, logged at the end
+        self.max_pending = 0
+
+        self.translated_text_file = open(translated_text_path, 'w', encoding='utf-8')
+        self.je_check_file = open(je_check_path, 'w', encoding='utf-8')
+
+##-------------------start-of-push()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def push(self, batch_number:int, result:typing.Any) -> typing.List[typing.Any]:
+
+        """
+
+        Adds a finished batch to the buffer.
+
+        Parameters:
+        batch_number (int) : The number of the finished batch.
+        result (any) : The result of the batch.
+
+        Returns:
+        ready_results (list) : The results that can now be written, in batch order. Empty if an earlier batch is still running.
+
+        """
+
+        self.pending[batch_number] = result
+        self.max_pending = max(self.max_pending, len(self.pending))
+
+        ready_results = []
+
+        while(self.next_batch_number in self.pending):
+            ready_results.append(self.pending.pop(self.next_batch_number))
+            self.next_batch_number += 1
+
+        return ready_results
+
+##-------------------start-of-write()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def write(self, translated_text:typing.List[str], je_check_text:typing.List[str]) -> None:
+
+        """
+
+        Appends text to the output files and flushes them, so they are usable while the run is still going.
+
+        Parameters:
+        translated_text (list[str]) : The translated text to append.
+        je_check_text (list[str]) : The j-e check text to append.
+
+        """
+
+        self.translated_text_file.writelines(translated_text)
+        self.translated_text_file.flush()
+
+        self.je_check_file.writelines(je_check_text)
+        self.je_check_file.flush()
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        """
+
+        Closes the output files.
+
+        """
+
+        if(len(self.pending) > 0):
+            logging.warning(f"{len(self.pending)} batches were never written, as an earlier batch did not finish.")
+
+        logging.debug(f"Ordered writer closed, at most {self.max_pending} batches were waiting on an earlier one.")
+
+        self.translated_text_file.close()
+        self.je_check_file.close()
@@ -0,0 +1,168 @@
+## built-in libraries
+import time
+import typing
+import asyncio
+import logging
+
+##-------------------start-of-TokenBucket---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class TokenBucket:
+
+    """
+
+    TokenBucket meters a per-minute budget (requests or tokens), refilling continuously.
+    Waiters are served in order, and a single request larger than the bucket is let through once it is full, leaving the bucket in debt.
+
+    """
+
+    ## how many seconds of budget can be spent in a burst, providers enforce their per-minute limits over shorter windows
+    BURST_SECONDS = 10.0
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, per_minute:float) -> None:
+
+        """
+
+        Parameters:
+        per_minute (float) : The budget per minute.
+
+        """
+
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * TokenBucket.BURST_SECONDS)
+
+        self.tokens = self.capacity
+        self.last_refill_time = time.monotonic()
+
+        self.lock = asyncio.Lock()
+
+        self.total_wait_time = 0.0
+
+##-------------------start-of-refill()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def refill(self) -> None:
+
+        """
+
+        Adds the budget accrued since the last refill.
+
+        """
+
+        now = time.monotonic()
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill_time) * self.rate)
+        self.last_refill_time = now
+
+##-------------------start-of-take()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def take(self, amount:float) -> None:
+
+        """
+
+        Waits until the amount can be spent, then spends it.
+
+        Parameters:
+        amount (float) : How much of the budget to spend.
+
+        """
+
+        async with self.lock:
+
+            needed = min(amount, self.capacity)
+
+            self.refill()
+
+            while(self.tokens < needed):
+
+                wait_time = (needed - self.tokens) / self.rate
+
+                self.total_wait_time += wait_time
+
+                await asyncio.sleep(wait_time)
+
+                self.refill()
+
+            self.tokens -= amount
+
+##-------------------start-of-RateLimiter---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class RateLimiter:
+
+    """
+
+    RateLimiter keeps requests under a provider's requests per minute and tokens per minute limits, so they are spaced out instead of being rejected and backed off.
+
+    """
+
+    ## fraction of the configured limits that is actually used, to stay just under them
+    SAFETY_MARGIN = 0.95
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, requests_per_minute:typing.Optional[int]=None, tokens_per_minute:typing.Optional[int]=None) -> None:
+
+        """
+
+        Parameters:
+        requests_per_minute (int | None | optional | default=None) : The requests per minute limit, None for no limit.
+        tokens_per_minute (int | None | optional | default=None) : The tokens per minute limit, None for no limit.
+
+        """
+
+        self.request_bucket = TokenBucket(requests_per_minute * RateLimiter.SAFETY_MARGIN) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute * RateLimiter.SAFETY_MARGIN) if tokens_per_minute else None
+
+##-------------------start-of-is_limited()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def is_limited(self) -> bool:
+
+        """
+
+        Returns:
+        (bool) : Whether there is any limit to enforce.
+
+        """
+
+        return self.request_bucket is not None or self.token_bucket is not None
+
+##-------------------start-of-total_wait_time()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def total_wait_time(self) -> float:
+
+        """
+
+        Returns:
+        (float) : How long requests have waited on the limits in total, in seconds.
+
+        """
+
+        return sum(bucket.total_wait_time for bucket in [self.request_bucket, self.token_bucket] if bucket is not None)
+
+##-------------------start-of-wait()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def wait(self, num_tokens:int=0) -> None:
+
+        """
+
+        Waits until a request of the given size fits in the limits.
+
+        Parameters:
+        num_tokens (int | optional | default=0) : The estimated number of tokens of the request.
+
+        """
+
+        start_time = time.monotonic()
+
+        if(self.request_bucket is not None):
+            await self.request_bucket.take(1)
+
+        if(self.token_bucket is not None and num_tokens > 0):
+            await self.token_bucket.take(num_tokens)
+
+        waited = time.monotonic() - start_time
+
+        if(waited > 1.0):
+            logging.debug(f"Waited {round(waited, 2)} seconds to stay under the rate limits.")
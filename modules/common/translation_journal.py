@@ -0,0 +1,187 @@
+## built-in libraries
+import os
+import json
+import typing
+import logging
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-TranslationJournal---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class TranslationJournal:
+
+    """
+
+    TranslationJournal is an append-only record of the batches completed during a translation run, so an interrupted run can be resumed without paying for those batches again.
+    The first line is a header identifying the run, every other line is one completed batch. Each line is flushed to disk as soon as it is written.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, translation_method:str, model:str, resume:bool=False, journal_path:typing.Optional[str]=None) -> None:
+
+        """
+
+        Opens the journal, either continuing the previous one or starting over.
+
+        Parameters:
+        translation_method (str) : The translation method of the run.
+        model (str) : The model of the run.
+        resume (bool | optional | default=False) : Whether to keep the batches of the previous run, only done if it used the same method and model.
+        journal_path (str | optional | default=None) : The path to the journal, defaults to FileEnsurer.translation_journal_path.
+
+        """
+
+        self.journal_path = journal_path or FileEnsurer.translation_journal_path
+
+        FileEnsurer.standard_create_directory(os.path.dirname(self.journal_path))
+
+        self.header = {"translation_method": translation_method, "model": model}
+
+        ## batch number -> (source, translation), of the run being resumed, the batches of this run are only kept on disk
+        self.entries:typing.Dict[int, typing.Tuple[str, str]] = {}
+
+        self.num_resumed_batches = 0
+
+        if(resume):
+            self.load()
+
+        ## rewritten rather than appended to, so a line cut off by a crash can't corrupt the next one
+        ## the new journal is written next to the old one and only replaces it once it's on disk, so a crash mid-rewrite can't lose the batches being resumed
+        temporary_path = self.journal_path + ".tmp"
+
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+            file.writelines(json.dumps({"batch_number": batch_number, "source": source, "translation": translation}, ensure_ascii=False) + "\n" for batch_number, (source, translation) in self.entries.items())
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary_path, self.journal_path)
+
+        self.file = open(self.journal_path, 'a', encoding='utf-8')
+
+##-------------------start-of-load()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def load(self) -> None:
+
+        """
+
+        Loads the batches of the previous run, if there is one and it used the same method and model.
+
+        """
+
+        if(not os.path.exists(self.journal_path)):
+            logging.warning("No translation journal found, nothing to resume.")
+            return
+
+        with open(self.journal_path, 'r', encoding='utf-8') as file:
+            lines = file.read().splitlines()
+
+        try:
+            previous_header = json.loads(lines[0])
+
+        except (IndexError, json.JSONDecodeError):
+            logging.warning("Translation journal is empty or unreadable, nothing to resume.")
+            return
+
+        if(previous_header != self.header):
+            logging.warning(f"Translation journal is for a different run ({previous_header}), nothing to resume.")
+            return
+
+        for line in lines[1:]:
+
+            try:
+                entry = json.loads(line)
+
+            ## the last line may have been cut off by a crash
+            except json.JSONDecodeError:
+                logging.debug(f"Skipping unreadable translation journal line : {line}")
+                continue
+
+            self.entries[int(entry["batch_number"])] = (entry["source"], entry["translation"])
+
+        logging.info(f"Translation journal loaded, {len(self.entries)} batches can be resumed.")
+
+##-------------------start-of-get()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get(self, batch_number:int, source:str) -> typing.Optional[str]:
+
+        """
+
+        Gets the journaled translation of a batch, as long as the batch still has the same source text.
+
+        Parameters:
+        batch_number (int) : The batch number.
+        source (str) : The text of the batch.
+
+        Returns:
+        translation (str | None) : The journaled translation, or None if the batch has to be translated.
+
+        """
+
+        if(not self.has(batch_number, source)):
+            return None
+
+        self.num_resumed_batches += 1
+
+        return self.entries[batch_number][1]
+
+##-------------------start-of-has()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def has(self, batch_number:int, source:str) -> bool:
+
+        """
+
+        Checks whether a batch can be resumed, without counting it as resumed like get() does.
+
+        Parameters:
+        batch_number (int) : The batch number.
+        source (str) : The text of the batch.
+
+        Returns:
+        (bool) : True if the journal has a translation of the batch with the same source text.
+
+        """
+
+        entry = self.entries.get(batch_number)
+
+        return entry is not None and entry[0] == source
+
+##-------------------start-of-record()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record(self, batch_number:int, source:str, translation:str, translation_method:typing.Optional[str]=None) -> None:
+
+        """
+
+        Records a completed batch, flushing it to disk immediately.
+
+        Parameters:
+        batch_number (int) : The batch number.
+        source (str) : The text of the batch.
+        translation (str) : The translated text.
+        translation_method (str | optional | default=None) : The translation method that served the batch, defaults to the method of the run.
+
+        """
+
+        entry = {"batch_number": batch_number, "source": source, "translation": translation}
+
+        if(translation_method is not None):
+            entry["translation_method"] = translation_method
+
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        """
+
+        Closes the journal file.
+
+        """
+
+        self.file.close()
@@ -0,0 +1,179 @@
+## built-in libraries
+import os
+import json
+import time
+import typing
+import sqlite3
+import hashlib
+import logging
+
+## custom modules
+from modules.common.file_ensurer import FileEnsurer
+
+##-------------------start-of-TranslationMemory---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class TranslationMemory:
+
+    """
+
+    TranslationMemory is an on-disk cache of previously translated batches, stored as a SQLite database in the config directory.
+    Entries are keyed by a hash of the batch text, the translation method, the model, the instructions and the sampling settings, so changing any of those results in a miss.
+
+    """
+
+    ## entries that have not been used in this many days are evicted
+    MAX_AGE_DAYS = 90
+
+    ## once the memory grows past this many entries, the least recently used ones are evicted
+    MAX_ENTRIES = 50000
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, database_path:typing.Optional[str]=None) -> None:
+
+        """
+
+        Opens (or creates) the translation memory database and evicts stale entries.
+
+        Parameters:
+        database_path (str | optional | default=None) : The path to the SQLite database, defaults to FileEnsurer.translation_memory_path.
+
+        """
+
+        database_path = database_path or FileEnsurer.translation_memory_path
+
+        FileEnsurer.standard_create_directory(os.path.dirname(database_path))
+
+        self.database_path = database_path
+
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_stored = 0
+
+        self.connection = sqlite3.connect(database_path)
+
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS batches (
+                key TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+
+        self.connection.execute("CREATE INDEX IF NOT EXISTS batches_last_used_at ON batches (last_used_at)")
+        self.connection.commit()
+
+        self.evict()
+
+##-------------------start-of-make_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(text:str, translation_method:str, model:str, translation_instructions:typing.Optional[str], sampling_settings:dict) -> str:
+
+        """
+
+        Builds the cache key for a batch.
+
+        Parameters:
+        text (str) : The text being translated.
+        translation_method (str) : The translation method used.
+        model (str) : The model used.
+        translation_instructions (str | None) : The instructions sent with the batch, if any.
+        sampling_settings (dict) : The sampling settings sent with the batch.
+
+        Returns:
+        key (str) : The sha256 hex digest identifying the batch.
+
+        """
+
+        key_material = json.dumps([text, translation_method, model, translation_instructions, sampling_settings], ensure_ascii=False, sort_keys=True, default=str)
+
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+##-------------------start-of-get()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get(self, key:str) -> typing.Optional[str]:
+
+        """
+
+        Fetches a translation from the memory, counting the lookup as a hit or a miss.
+
+        Parameters:
+        key (str) : The key made by make_key().
+
+        Returns:
+        translation (str | None) : The stored translation, or None if there is none.
+
+        """
+
+        row = self.connection.execute("SELECT translation FROM batches WHERE key = ?", (key,)).fetchone()
+
+        if(row is None):
+            self.num_misses += 1
+            return None
+
+        self.num_hits += 1
+
+        self.connection.execute("UPDATE batches SET last_used_at = ? WHERE key = ?", (time.time(), key))
+        self.connection.commit()
+
+        return row[0]
+
+##-------------------start-of-store()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def store(self, key:str, translation:str) -> None:
+
+        """
+
+        Stores a translation in the memory, replacing any previous entry for the key.
+
+        Parameters:
+        key (str) : The key made by make_key().
+        translation (str) : The translated text.
+
+        """
+
+        now = time.time()
+
+        self.connection.execute("INSERT OR REPLACE INTO batches (key, translation, created_at, last_used_at) VALUES (?, ?, ?, ?)", (key, translation, now, now))
+        self.connection.commit()
+
+        self.num_stored += 1
+
+##-------------------start-of-evict()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def evict(self) -> None:
+
+        """
+
+        Removes entries older than MAX_AGE_DAYS, then the least recently used entries past MAX_ENTRIES.
+
+        """
+
+        cutoff = time.time() - TranslationMemory.MAX_AGE_DAYS * 86400
+
+        num_expired = self.connection.execute("DELETE FROM batches WHERE last_used_at < ?", (cutoff,)).rowcount
+
+        num_overflowing = self.connection.execute("""
+            DELETE FROM batches WHERE key IN (
+                SELECT key FROM batches ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (TranslationMemory.MAX_ENTRIES,)).rowcount
+
+        self.connection.commit()
+
+        if(num_expired or num_overflowing):
+            logging.debug(f"Evicted {num_expired} expired and {num_overflowing} overflowing entries from the translation memory.")
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        """
+
+        Closes the database connection.
+
+        """
+
+        self.connection.close()
@@ -0,0 +1,2167 @@
+## built-in libraries
+import typing
+import base64
+import functools
+import bisect
+import re
+import os
+import time
+import asyncio
+import logging
+import array
+import hashlib
+
+## third party modules
+from easytl import EasyTL, Message, SystemTranslationMessage, ModelTranslationMessage
+
+import backoff
+
+## custom modules
+from handlers.json_handler import JsonHandler
+
+from modules.common.file_ensurer import FileEnsurer
+from modules.common.toolkit import Toolkit
+from modules.common.exceptions import OpenAIAuthenticationError, MaxBatchDurationExceededException, OpenAIInternalServerError, OpenAIRateLimitError, OpenAIAPITimeoutError, OpenAIAPIStatusError, OpenAIAPIConnectionError, DeepLException, GoogleAPIError, DeepLTooManyRequestsException, MockProviderError
+from modules.common.gender_util import GenderUtil
+from modules.common.translation_memory import TranslationMemory
+from modules.common.line_memory import LineMemory
+from modules.common.translation_journal import TranslationJournal
+from modules.common.ordered_writer import OrderedWriter
+from modules.common.adaptive_limiter import AdaptiveLimiter
+from modules.common.rate_limiter import RateLimiter
+from modules.common.line_classifier import LineClassifier
+from modules.common.batch_metrics import BatchMetrics
+from modules.common.cost_estimator import CostEstimator
+from modules.common.mock_provider import MockProvider
+from modules.common.batch_job import BatchJob
+
+##-------------------start-of-TranslationSession--------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class TranslationSession:
+
+    """
+
+    TranslationSession is a single translation run. It owns its text, settings, batches, limiters, caches and results, so a new session starts from a clean slate rather than whatever the last run left behind.
+    Sessions can't run at the same time in one process though, as they still set process-wide state when loading their settings : the EasyTL credentials (including the failover method's), GenderUtil.is_cote and the MockProvider settings.
+    Sessions without an output_dir also share FileEnsurer.output_dir, so their journal, metrics and preview overwrite each other.
+    Translator wraps a session for the CLI and the webgui, embedding code can create sessions directly.
+
+    """
+
+    ## batches this small are retried as a whole instead of split further
+    MIN_BISECT_LINES = 1
+
+    ## used by sentence_fragmenter_mode 1 to split translated text into sentences
+    SENTENCE_PATTERN = re.compile(r"(.*?(?:(?:\"|\'|-|~|!|\?|%|\(|\)|\.\.\.|\.|---|\[|\])))(?:\s|$)")
+
+    ## how far past number_of_concurrent_batches the adaptive limiter may go
+    MAX_CONCURRENCY_MULTIPLIER = 4
+
+    ## the most a batch can hold when batching by number_of_tokens_per_batch, in tokens for llms and characters otherwise
+    ## translations are about as long as their source, so the llm caps follow the smallest max output of the supported models
+    MAX_BATCH_SIZES = {
+        "openai": 4000,
+        "gemini": 2000,
+        "deepl": 30000,
+        "google translate": 5000,
+        "mock": 30000
+    }
+
+    ## cap on how many remembered lines are sent as hints with a single batch
+    MAX_LINE_MEMORY_HINTS = 10
+
+    ## lines are classified this many at a time as batches are built, rather than the whole text before the first batch
+    LINE_CLASSIFICATION_CHUNK_SIZE = 2000
+
+    ## how many batches are handed out ahead of each concurrency slot, so a slot that frees up never waits on batches being built
+    BATCHES_AHEAD_PER_SLOT = 2
+
+    ## how often a run checks whether it has been interrupted, and how long it gives its batches to stop once cancelled, in seconds
+    INTERRUPT_POLL_SECONDS = 0.1
+    CANCELLATION_TIMEOUT = 5.0
+
+    ## a request still running after this percentile of the latencies seen so far is hedged, if hedge_slow_requests is set
+    HEDGE_PERCENTILE = 0.95
+
+    ## how many requests have to finish before their latencies are trusted for hedging
+    MIN_HEDGE_SAMPLES = 10
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 translation_method:typing.Literal["openai", "gemini", "deepl", "google translate", "mock"],
+                 text_to_translate:typing.List[str],
+                 translation_settings:typing.Optional[dict]=None,
+                 is_resuming:bool=False,
+                 output_dir:typing.Optional[str]=None) -> None:
+
+        """
+
+        Sets up the session, nothing is read or sent until commence_translation() is called.
+
+        Parameters:
+        translation_method (str) : The translation method to use.
+        text_to_translate (list - str) : The lines of the text to translate.
+        translation_settings (dict | optional | default=None) : The translation settings, defaults to JsonHandler.current_translation_settings. Should already be validated.
+        is_resuming (bool | optional | default=False) : Whether to skip the batches journaled by a previous (interrupted) run with the same output directory.
+        output_dir (str | optional | default=None) : Where the translated text, j-e check text and journal are written, defaults to FileEnsurer.output_dir.
+
+        """
+
+        self.translation_method = translation_method
+        self.text_to_translate = text_to_translate
+        self.translation_settings = translation_settings if translation_settings is not None else JsonHandler.current_translation_settings
+        self.is_resuming = is_resuming
+
+        self.output_dir = output_dir or FileEnsurer.output_dir
+        self.translated_text_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.translated_text_path))
+        self.je_check_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.je_check_path))
+        self.translation_journal_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.translation_journal_path))
+        self.batch_metrics_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.batch_metrics_path))
+        self.preview_text_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.preview_text_path))
+        self.batch_metrics_prometheus_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.batch_metrics_prometheus_path))
+        self.batch_job_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.batch_job_path))
+        self.batch_job_state_path = os.path.join(self.output_dir, os.path.basename(FileEnsurer.batch_job_state_path))
+
+        ## the class (skip, marker or content) of each line of text_to_translate, see LineClassifier
+        self.line_classes:array.array = array.array('b')
+
+        self.translated_text:typing.List[str] = []
+        self.je_check_text:typing.List[str] = []
+        self.error_text:typing.List[str] = []
+
+        self.num_occurred_malformed_batches = 0
+
+        ## how many times a malformed batch (or part of one) was split in two
+        self.num_batch_splits = 0
+
+        ## limits the number of concurrent batches, adjusting itself to rate limits and latency if use_adaptive_concurrency is set
+        self.concurrency_limiter = AdaptiveLimiter(5)
+
+        ## keeps requests under the requests/tokens per minute limits of the translation method
+        self.rate_limiter = RateLimiter()
+
+        ## tokenizer used to size batches, None if sizing by characters
+        self.batch_tokenizer:typing.Optional[typing.Any] = None
+
+        ## on-disk cache of previously translated batches, only opened if use_translation_memory is set
+        self.translation_memory:typing.Optional[TranslationMemory] = None
+
+        ## line-level memory of previous runs, only opened if use_line_memory is set
+        self.line_memory:typing.Optional[LineMemory] = None
+
+        ## append-only record of the completed batches of this run
+        self.translation_journal:typing.Optional[TranslationJournal] = None
+
+        ## per-batch metrics of this run, opened with the output files
+        self.batch_metrics:typing.Optional[BatchMetrics] = None
+
+        ## the translation method stalled batches are sent to, None if failover is off
+        self.failover_translation_method:typing.Optional[str] = None
+
+        ## until when (time.monotonic()) new batches go straight to the failover method, set whenever a batch fails over
+        self.failover_until = 0.0
+
+        self.failover_rate_limiter = RateLimiter()
+
+        ## batch number -> what served it, a translation method, or the journal/memory/duplicate batch it was reused from
+        self.batch_providers:typing.Dict[int, str] = {}
+
+        self.num_batches = 0
+
+        ## the batches (first and last, inclusive) sent before all others, None to send them in order
+        self.priority_batch_range:typing.Optional[typing.Tuple[int, int]] = None
+
+        ## the first batches to be sent, written to the preview as soon as they are all done
+        self.preview_batch_numbers:typing.Set[int] = set()
+
+        ## batches identical to an earlier batch of the run, and the tokens (estimated, characters for deepl/google translate) they would have used, see add_request()
+        self.num_duplicate_batches = 0
+        self.num_duplicate_entities = 0
+
+        ## latencies of the requests to the main method, sorted, for hedging
+        self.request_latencies:typing.List[float] = []
+
+        self.num_hedged_requests = 0
+        self.num_won_hedges = 0
+
+        ## name -> gender assumption (None if it isn't a name), for gender_context_insertion
+        ## built from the genders file as of GenderUtil.genders_version known_genders_version, and cleared once it changes
+        self.known_genders:typing.Dict[str, typing.Optional[str]] = {}
+        self.known_genders_version = 0
+
+        ## the openai batch job, resolving to batch number -> translation, see openai_use_batch_api
+        self.batch_job_task:typing.Optional[asyncio.Future] = None
+
+        ## hash of the normalized batch and instructions -> the request of the first batch with them, see add_request()
+        ## once the request is done, only its batch number and translation are kept
+        self.original_requests:typing.Dict[bytes, typing.Union[asyncio.Future, typing.Tuple[int, str]]] = {}
+
+        ## batch number, prompt and instructions of the batches that are actually sent, only kept if there is a batch job
+        self.batch_job_batches:typing.List[typing.Tuple[int, str, typing.Optional[str]]] = []
+
+        ## set once every batch of the text has been built and handed out, until then num_batches is only the count so far
+        self.batches_built = asyncio.Event()
+
+        ## set by interrupt(), FileEnsurer.do_interrupt (the webgui's clear button) stops every session instead
+        self.do_interrupt = False
+
+        ## batches still running when the run was interrupted (or failed), and were cancelled
+        self.num_cancelled_batches = 0
+
+        self.translation_print_result = ""
+
+        self.decorator_to_use:typing.Callable
+        self.failover_decorator:typing.Callable
+
+##-------------------start-of-load_settings()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def load_settings(self) -> None:
+
+        """
+
+        Loads the translation settings of the session, and sets up the limiters and caches they ask for.
+
+        """
+
+        base_settings = self.translation_settings["base translation settings"]
+        openai_settings = self.translation_settings["openai settings"]
+        gemini_settings = self.translation_settings["gemini settings"]
+        deepl_settings = self.translation_settings["deepl settings"]
+
+        self.prompt_assembly_mode = int(base_settings["prompt_assembly_mode"])
+        self.number_of_lines_per_batch = int(base_settings["number_of_lines_per_batch"])
+        self.number_of_tokens_per_batch:typing.Optional[int] = base_settings["number_of_tokens_per_batch"]
+        self.bisect_malformed_batches = bool(base_settings["bisect_malformed_batches"])
+        self.sentence_fragmenter_mode = int(base_settings["sentence_fragmenter_mode"])
+        self.je_check_mode = int(base_settings["je_check_mode"])
+        self.num_of_malform_retries = int(base_settings["number_of_malformed_batch_retries"])
+        self.max_batch_duration = float(base_settings["batch_retry_timeout"])
+        self.num_concurrent_batches = int(base_settings["number_of_concurrent_batches"])
+        self.gender_context_insertion = bool(base_settings["gender_context_insertion"])
+        self.is_cote = bool(base_settings["is_cote"])
+        self.use_translation_memory = bool(base_settings["use_translation_memory"])
+        self.use_line_memory = bool(base_settings["use_line_memory"])
+        self.use_adaptive_concurrency = bool(base_settings["use_adaptive_concurrency"])
+        self.failover_translation_method = base_settings["failover_translation_method"]
+        self.failover_after_seconds = float(base_settings["failover_after_seconds"])
+        self.hedge_slow_requests = bool(base_settings["hedge_slow_requests"])
+        self.max_hedged_request_fraction = float(base_settings["max_hedged_request_fraction"])
+        self.preview_batch_count = int(base_settings["preview_batch_count"])
+
+        if(base_settings["priority_batch_range"] is not None):
+            first_batch, last_batch = sorted(int(batch_number) for batch_number in base_settings["priority_batch_range"].split("-"))
+            self.priority_batch_range = (first_batch, last_batch)
+
+        ## GenderUtil is still process-wide, which is one reason sessions can't run at the same time
+        GenderUtil.is_cote = self.is_cote
+
+        ## the limit can only grow past number_of_concurrent_batches if use_adaptive_concurrency is set
+        self.concurrency_limiter = AdaptiveLimiter(self.num_concurrent_batches,
+                                                   max_limit=self.num_concurrent_batches * TranslationSession.MAX_CONCURRENCY_MULTIPLIER if self.use_adaptive_concurrency else None,
+                                                   is_adaptive=self.use_adaptive_concurrency)
+
+        self.openai_model = openai_settings["openai_model"]
+        self.openai_system_message = openai_settings["openai_system_message"]
+        self.openai_temperature = float(openai_settings["openai_temperature"])
+        self.openai_top_p = float(openai_settings["openai_top_p"])
+        self.openai_n = int(openai_settings["openai_n"])
+        self.openai_stream = bool(openai_settings["openai_stream"])
+        self.openai_stop = openai_settings["openai_stop"]
+        self.openai_logit_bias = openai_settings["openai_logit_bias"]
+        self.openai_max_tokens = openai_settings["openai_max_tokens"]
+        self.openai_presence_penalty = float(openai_settings["openai_presence_penalty"])
+        self.openai_frequency_penalty = float(openai_settings["openai_frequency_penalty"])
+        self.openai_requests_per_minute = openai_settings["openai_requests_per_minute"]
+        self.openai_tokens_per_minute = openai_settings["openai_tokens_per_minute"]
+        self.openai_use_batch_api = openai_settings["openai_use_batch_api"]
+        self.openai_batch_poll_seconds = openai_settings["openai_batch_poll_seconds"]
+
+        self.gemini_model = gemini_settings["gemini_model"]
+        self.gemini_prompt = gemini_settings["gemini_prompt"]
+        self.gemini_temperature = float(gemini_settings["gemini_temperature"])
+        self.gemini_top_p = gemini_settings["gemini_top_p"]
+        self.gemini_top_k = gemini_settings["gemini_top_k"]
+        self.gemini_candidate_count = gemini_settings["gemini_candidate_count"]
+        self.gemini_stream = bool(gemini_settings["gemini_stream"])
+        self.gemini_stop_sequences = gemini_settings["gemini_stop_sequences"]
+        self.gemini_max_output_tokens = gemini_settings["gemini_max_output_tokens"]
+        self.gemini_requests_per_minute = gemini_settings["gemini_requests_per_minute"]
+        self.gemini_tokens_per_minute = gemini_settings["gemini_tokens_per_minute"]
+
+        self.deepl_context = deepl_settings["deepl_context"]
+        self.deepl_split_sentences = deepl_settings["deepl_split_sentences"]
+        self.deepl_preserve_formatting = deepl_settings["deepl_preserve_formatting"]
+        self.deepl_formality = deepl_settings["deepl_formality"]
+
+        rate_limits = {
+            "openai": (self.openai_requests_per_minute, self.openai_tokens_per_minute),
+            "gemini": (self.gemini_requests_per_minute, self.gemini_tokens_per_minute),
+            "deepl": (None, None),
+            "google translate": (None, None),
+            "mock": (None, None)
+        }
+
+        self.rate_limiter = RateLimiter(*rate_limits[self.translation_method])
+
+        self.decorator_to_use = TranslationSession.build_decorator(self.translation_method,
+                                                                   get_max_time=lambda: self.get_max_batch_duration(),
+                                                                   on_backoff=lambda details: self.handle_retry(details))
+
+        if(self.failover_translation_method == self.translation_method):
+            self.failover_translation_method = None
+
+        if(self.failover_translation_method is not None):
+            self.load_failover_credentials()
+
+        ## the failover method gets whatever is left of batch_retry_timeout, and doesn't touch the concurrency limit of the main one
+        if(self.failover_translation_method is not None):
+            self.failover_rate_limiter = RateLimiter(*rate_limits[self.failover_translation_method])
+
+            self.failover_decorator = TranslationSession.build_decorator(self.failover_translation_method,
+                                                                         get_max_time=lambda: max(self.max_batch_duration - self.failover_after_seconds, 0.0),
+                                                                         on_backoff=lambda details: self.handle_retry(details, is_main_method=False))
+
+        if(self.use_translation_memory):
+            self.translation_memory = TranslationMemory()
+
+        ## the mock method makes up its translations, so they aren't worth remembering
+        if(self.use_line_memory and self.translation_method != "mock"):
+            self.line_memory = LineMemory(self.translation_method, {"openai": self.openai_model, "gemini": self.gemini_model}.get(self.translation_method, self.translation_method))
+
+##-------------------start-of-build_decorator()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def build_decorator(translation_method:str, get_max_time:typing.Callable[[], float], on_backoff:typing.Callable) -> typing.Callable:
+
+        """
+
+        Builds the backoff decorator requests to a translation method are retried with.
+
+        Parameters:
+        translation_method (str) : the translation method.
+        get_max_time (callable) : returns how long a request may keep retrying, in seconds.
+        on_backoff (callable) : called with the details of each retry.
+
+        Returns:
+        decorator (callable) : the backoff decorator.
+
+        """
+
+        exception_dict = {
+            "openai": (OpenAIAuthenticationError, OpenAIInternalServerError, OpenAIRateLimitError, OpenAIAPITimeoutError, OpenAIAPIConnectionError, OpenAIAPIStatusError),
+            "gemini": GoogleAPIError,
+            "deepl": DeepLException,
+            "google translate": GoogleAPIError,
+            "mock": MockProviderError
+        }
+
+        return backoff.on_exception(
+            backoff.expo,
+            max_time=get_max_time,
+            exception=exception_dict.get(translation_method, None),
+            on_backoff=on_backoff,
+            on_giveup=lambda details: TranslationSession.log_failure(details),
+            raise_on_giveup=False
+        )
+
+##-------------------start-of-load_failover_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def load_failover_credentials(self) -> None:
+
+        """
+
+        Sets the credentials of the failover method from its saved API key, turning failover off if there isn't one.
+
+        """
+
+        ## the mock method has no credentials
+        if(self.failover_translation_method == "mock"):
+            logging.info(f"Batches that stall on {self.translation_method} for {self.failover_after_seconds} seconds will fail over to mock.")
+            return
+
+        api_key_paths = {
+            "openai": FileEnsurer.openai_api_key_path,
+            "gemini": FileEnsurer.gemini_api_key_path,
+            "deepl": FileEnsurer.deepl_api_key_path,
+            "google translate": FileEnsurer.google_translate_service_key_json_path
+        }
+
+        api_key_path = api_key_paths[self.failover_translation_method] # type: ignore
+
+        try:
+
+            ## google translate is given the path to the service json, the others a base64 encoded key
+            if(self.failover_translation_method != "google translate"):
+                with open(api_key_path, 'r', encoding='utf-8') as file:
+                    api_key = base64.b64decode((file.read()).encode('utf-8')).decode('utf-8')
+
+            else:
+                assert os.path.exists(api_key_path), f"{api_key_path} does not exist"
+                api_key = api_key_path
+
+            EasyTL.set_credentials(self.failover_translation_method, api_key) # type: ignore
+
+            logging.info(f"Batches that stall on {self.translation_method} for {self.failover_after_seconds} seconds will fail over to {self.failover_translation_method}.")
+
+        except Exception as e:
+            logging.warning(f"Could not load the saved {self.failover_translation_method} API key ({e}), failover is off.")
+            self.failover_translation_method = None
+
+##-------------------start-of-get_max_batch_duration()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_max_batch_duration(self) -> float:
+
+        """
+
+        Returns the max batch duration, or how long a batch may stall before failing over if failover is on.
+        Structured as a function so that it can be used as a lambda function in the backoff decorator. As decorators call the function when they are defined/runtime, not when they are called. Which I learned the hard way.
+
+        Returns:
+        max_batch_duration (float) : the max batch duration.
+
+        """
+
+        if(self.failover_translation_method is not None):
+            return min(self.max_batch_duration, self.failover_after_seconds)
+
+        return self.max_batch_duration
+
+##-------------------start-of-log_retry()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def log_retry(details) -> None:
+
+        """
+
+        Logs the retry message.
+
+        Parameters:
+        details (dict) : the details of the retry.
+
+        """
+
+        retry_msg = f"Retrying translation after {details['wait']} seconds after {details['tries']} tries {details['target']} due to {details['exception']}."
+
+        logging.warning(retry_msg)
+
+##-------------------start-of-handle_retry()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def handle_retry(self, details, is_main_method:bool=True) -> None:
+
+        """
+
+        Logs and counts the retry, and lowers the concurrency limit if the retry was caused by a rate limit or server error on the main method.
+
+        Parameters:
+        details (dict) : the details of the retry.
+        is_main_method (bool | optional | default=True) : whether the retried request was to the main method rather than the failover one.
+
+        """
+
+        TranslationSession.log_retry(details)
+
+        BatchMetrics.count("num_retries")
+
+        if(is_main_method and TranslationSession.is_overload_error(details['exception'])):
+            self.concurrency_limiter.on_overload()
+
+##-------------------start-of-is_overload_error()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def is_overload_error(exception:BaseException) -> bool:
+
+        """
+
+        Determines whether an exception means the service is overloaded (429 or 5xx), as opposed to a bad request or a connection issue.
+
+        Parameters:
+        exception (BaseException) : the exception raised by the translation method.
+
+        Returns:
+        (bool) : whether the exception is a rate limit or server error.
+
+        """
+
+        if(isinstance(exception, (OpenAIRateLimitError, OpenAIInternalServerError, DeepLTooManyRequestsException))):
+            return True
+
+        ## OpenAIAPIStatusError has status_code, google's errors have code
+        status_code = getattr(exception, "status_code", None) or getattr(exception, "code", None)
+
+        return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+##-------------------start-of-log_failure()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def log_failure(details) -> None:
+
+        """
+
+        Logs the translation batch failure message.
+
+        Parameters:
+        details (dict) : the details of the failure.
+
+        Raises:
+        MaxBatchDurationExceededException : An exception that is raised when the max batch duration is exceeded.
+
+        """
+
+        error_msg = f"Exceeded allowed duration of {round(details['elapsed'], 2)} seconds, returning untranslated text after {details['tries']} tries {details['target']}."
+
+        logging.error(error_msg)
+
+        raise MaxBatchDurationExceededException(error_msg)
+
+##-------------------start-of-interrupt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def interrupt(self) -> None:
+
+        """
+
+        Stops the session, batches still running are cancelled.
+
+        """
+
+        self.do_interrupt = True
+
+##-------------------start-of-check_interrupt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def check_interrupt(self) -> None:
+
+        """
+
+        Raises if the session, or every session, has been interrupted.
+
+        """
+
+        if(self.do_interrupt or FileEnsurer.do_interrupt):
+            raise Exception("Interrupted by user.")
+
+##-------------------start-of-commence_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def commence_translation(self, omit_prompt:bool=True) -> None:
+
+        """
+
+        Uses all the other functions to translate the text of the session.
+        Batches are built as they are needed rather than all up front, so the first requests go out straight away however long the text is.
+
+        Parameters:
+        omit_prompt (bool | optional | default=True) : Whether to skip asking the user to confirm the cost estimate.
+
+        """
+
+        logging.debug(f"Translator Activated, Translation Method : {self.translation_method} "
+                     f"Settings are as follows : ")
+
+        for section, section_settings in self.translation_settings.items():
+            for key, value in section_settings.items():
+                logging.debug(f"{key} : {value}")
+
+        self.load_settings()
+
+        Toolkit.clear_console()
+
+        translation_methods = {
+            "openai": self.openai_model,
+            "gemini": self.gemini_model,
+            "deepl": "deepl",
+            "google translate": "google translate",
+            "mock": "mock"
+        }
+
+        model = translation_methods[self.translation_method]
+
+        self.translation_journal = TranslationJournal(self.translation_method, model, resume=self.is_resuming, journal_path=self.translation_journal_path)
+
+        if(len(self.translation_journal.entries) > 0):
+            logging.info("Resuming previous run, the cost estimate below still covers the whole text.")
+
+        ## the estimate only has to come first if the user has to confirm it, otherwise it's worked out alongside the translation
+        cost_estimate = None
+
+        if(not omit_prompt):
+            await self.handle_cost_estimate_prompt(model, omit_prompt=omit_prompt)
+            Toolkit.clear_console()
+
+        else:
+            cost_estimate = asyncio.ensure_future(self.handle_cost_estimate_prompt(model, omit_prompt=omit_prompt))
+
+        logging.info("Starting Translation...")
+
+        self.load_batch_tokenizer()
+
+        if(self.priority_batch_range is not None):
+            logging.info(f"Batches {self.priority_batch_range[0]} to {self.priority_batch_range[1]} will be translated first.")
+
+        FileEnsurer.standard_create_directory(self.output_dir)
+
+        ## batches are written as soon as every batch before them is done, rather than all at once at the end
+        ordered_writer = OrderedWriter(translated_text_path=self.translated_text_path, je_check_path=self.je_check_path)
+
+        self.batch_metrics = BatchMetrics(self.batch_metrics_path, self.batch_metrics_prometheus_path)
+
+        ## the requests only start once the job is done, they wait on it before sending anything
+        if(self.translation_method == "openai" and self.openai_use_batch_api):
+            self.batch_job_task = asyncio.ensure_future(self.run_batch_job(model))
+
+        ## the producer builds the batches into the queue, and they are handed out as requests from it
+        ## the queue is bounded so the producer stays just ahead of the requests rather than building the whole text
+        max_pending = self.concurrency_limiter.max_limit * TranslationSession.BATCHES_AHEAD_PER_SLOT
+
+        batch_queue:asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+        producer = asyncio.ensure_future(self.produce_batches(batch_queue))
+
+        ## a batch job needs every batch before any of them can finish, so they are all handed out
+        if(self.batch_job_task is not None):
+            max_pending = None
+
+        next_batch:typing.Optional[asyncio.Future] = asyncio.ensure_future(batch_queue.get())
+
+        ## requests handed out and not yet finished
+        pending_requests:typing.Set[asyncio.Future] = set()
+
+        ## batches only check for an interrupt between attempts, this notices it while they are still waiting on a response, a backoff or a slot
+        interrupt_watcher = asyncio.ensure_future(self.wait_for_interrupt())
+
+        ## j-e check text is fixed batch by batch if the mode is 2
+        fixed_je_check_text = []
+
+        ## batch number -> result, for the batches of the preview
+        preview_results = {}
+        is_preview_written = False
+
+        try:
+            while(next_batch is not None or len(pending_requests) > 0):
+
+                awaitables:typing.Set[asyncio.Future] = {*pending_requests, interrupt_watcher}
+
+                if(next_batch is not None and (max_pending is None or len(pending_requests) < max_pending)):
+                    awaitables.add(next_batch)
+
+                    ## so an error building the batches isn't left waiting on a queue nothing will be put in
+                    if(not producer.done()):
+                        awaitables.add(producer)
+
+                finished, _ = await asyncio.wait(awaitables, return_when=asyncio.FIRST_COMPLETED)
+
+                ## the batches still running are cancelled below
+                if(interrupt_watcher in finished):
+                    self.check_interrupt()
+
+                if(producer in finished):
+                    producer.result()
+
+                if(next_batch in finished):
+                    batch = next_batch.result()
+
+                    if(batch is None):
+                        next_batch = None
+                        self.finish_building_batches()
+
+                    else:
+                        pending_requests.add(self.add_request(model, *batch))
+
+                        if(len(self.preview_batch_numbers) < self.preview_batch_count):
+                            self.preview_batch_numbers.add(batch[0])
+
+                        next_batch = asyncio.ensure_future(batch_queue.get())
+
+                for finished_request in finished & pending_requests:
+
+                    pending_requests.discard(finished_request)
+
+                    result = finished_request.result()
+
+                    ## the preview batches may come from the middle of the text, so they can't wait on the ordered writer
+                    if(result[0] in self.preview_batch_numbers):
+                        preview_results[result[0]] = result
+
+                    for _, translated_prompt, translated_message in ordered_writer.push(result[0], result):
+
+                        num_translated_lines, num_je_check_lines = len(self.translated_text), len(self.je_check_text)
+
+                        self.redistribute(translated_prompt, translated_message)
+
+                        if(self.je_check_mode == 2):
+                            new_je_check_text = TranslationSession.fix_je_pair(self.je_check_text[-2], self.je_check_text[-1])
+                            fixed_je_check_text.extend(new_je_check_text)
+
+                        else:
+                            new_je_check_text = self.je_check_text[num_je_check_lines:]
+
+                        ordered_writer.write(self.translated_text[num_translated_lines:], new_je_check_text)
+
+                ## written once every preview batch is done, and no more can be added (there were fewer batches than preview_batch_count)
+                is_preview_complete = len(self.preview_batch_numbers) == self.preview_batch_count or self.batches_built.is_set()
+
+                if(not is_preview_written and len(self.preview_batch_numbers) > 0 and is_preview_complete and len(preview_results) == len(self.preview_batch_numbers)):
+                    self.write_preview(preview_results)
+                    is_preview_written = True
+
+            if(cost_estimate is not None):
+                await cost_estimate
+
+        finally:
+            self.num_cancelled_batches = len([request for request in pending_requests if not request.done()])
+
+            if(self.num_cancelled_batches > 0):
+                logging.warning(f"Cancelling the {self.num_cancelled_batches} batches still running, the batches already done are kept in the translation journal for --resume.")
+
+            ## the job itself keeps going on openai's side, a resumed run picks it back up
+            await self.cancel_tasks([*pending_requests, producer, next_batch, cost_estimate, interrupt_watcher, self.batch_job_task])
+
+            ## try to pair the text for j-e checking if the mode is 2, what was translated before an interrupt or error is kept
+            if(self.je_check_mode == 2):
+                self.je_check_text = fixed_je_check_text
+
+            ordered_writer.close()
+
+            if(self.translation_memory is not None):
+                self.translation_memory.close()
+
+            if(self.line_memory is not None):
+                self.line_memory.close()
+
+            self.translation_journal.close()
+
+            self.batch_metrics.close({
+                "run_duration_seconds": ("How long the batches took to translate.", round(time.perf_counter() - self.batch_metrics.start_time, 4)),
+                "batches": ("Number of batches in the run.", self.num_batches),
+                "concurrency_limit": ("Concurrency limit at the end of the run.", self.concurrency_limiter.current_limit),
+                "concurrency_limit_initial": ("Concurrency limit at the start of the run.", self.concurrency_limiter.initial_limit),
+                "rate_limit_wait_seconds": ("Time requests spent waiting on the rate limits.", round(self.rate_limiter.total_wait_time + self.failover_rate_limiter.total_wait_time, 4)),
+                "batches_cancelled": ("Number of batches cancelled by an interrupt or error before they finished.", self.num_cancelled_batches)
+            })
+
+        Toolkit.clear_console()
+
+        logging.info("Done!")
+
+##-------------------start-of-wait_for_interrupt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def wait_for_interrupt(self) -> None:
+
+        """
+
+        Returns once the session, or every session, has been interrupted, see check_interrupt().
+        FileEnsurer.do_interrupt is set from outside the event loop (the webgui's clear button), so it's polled rather than awaited.
+
+        """
+
+        while(not (self.do_interrupt or FileEnsurer.do_interrupt)):
+            await asyncio.sleep(TranslationSession.INTERRUPT_POLL_SECONDS)
+
+##-------------------start-of-cancel_tasks()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def cancel_tasks(self, tasks:typing.List[typing.Optional[asyncio.Future]]) -> None:
+
+        """
+
+        Cancels the tasks of a run that are still running, and waits (up to CANCELLATION_TIMEOUT) for them to stop.
+        Cancelling a request closes its connection and frees its concurrency slot, and a batch waiting on a backoff or the rate limits stops waiting.
+
+        Parameters:
+        tasks (list - asyncio.Future | None) : The tasks, None for those that were never started.
+
+        """
+
+        running_tasks = {task for task in tasks if task is not None and not task.done()}
+
+        if(len(running_tasks) == 0):
+            return
+
+        for task in running_tasks:
+            task.cancel()
+
+        stopped_tasks, still_running = await asyncio.wait(running_tasks, timeout=TranslationSession.CANCELLATION_TIMEOUT)
+
+        ## a task can fail rather than stop if it was already on its way out (e.g. raising the interrupt itself), that's expected here so it isn't reported
+        for task in stopped_tasks:
+            if(not task.cancelled()):
+                task.exception()
+
+        if(len(still_running) > 0):
+            logging.warning(f"{len(still_running)} tasks did not stop within {TranslationSession.CANCELLATION_TIMEOUT} seconds of being cancelled, leaving them behind.")
+
+##-------------------start-of-produce_batches()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def produce_batches(self, batch_queue:asyncio.Queue) -> None:
+
+        """
+
+        Builds the batches into the queue, in the order they should be sent (priority_batch_range first, then the order of the text), followed by None once there are no more.
+        The queue is bounded, so batches are only built a little ahead of the requests.
+
+        Parameters:
+        batch_queue (asyncio.Queue) : The queue, of batch number, prompt and instructions.
+
+        """
+
+        ## every batch shares the one instructions object, unless genders are added to it
+        translation_instructions = self.get_translation_instructions()
+
+        ## the batches before priority_batch_range, held back until the range has been built
+        held_back_batches = []
+
+        for batch_number, prompt in self.generate_translation_batches():
+
+            instructions = self.add_gender_context(prompt, translation_instructions)
+
+            logging.debug(f"Built batch {batch_number} :\n{instructions.content if isinstance(instructions, Message) else instructions}\n{prompt}")
+
+            if(self.priority_batch_range is not None and batch_number < self.priority_batch_range[0]):
+                held_back_batches.append((batch_number, prompt, instructions))
+                continue
+
+            await batch_queue.put((batch_number, prompt, instructions))
+
+            ## put() only waits when the queue is full, this lets the batch go out before the next one is built
+            await asyncio.sleep(0)
+
+            if(self.priority_batch_range is not None and batch_number == self.priority_batch_range[1]):
+                for held_back_batch in held_back_batches:
+                    await batch_queue.put(held_back_batch)
+
+                held_back_batches = []
+
+        ## the range went past the end of the text
+        for held_back_batch in held_back_batches:
+            await batch_queue.put(held_back_batch)
+
+        await batch_queue.put(None)
+
+##-------------------start-of-add_request()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def add_request(self, model:str, batch_number:int, prompt:str, instructions:typing.Union[str, SystemTranslationMessage, None]) -> asyncio.Future:
+
+        """
+
+        Starts the request of a batch.
+        A batch identical (after normalization) to an earlier batch is not sent, it waits on the earlier batch and reuses its translation.
+
+        Parameters:
+        model (string) : the model used to translate the text.
+        batch_number (int) : the batch number.
+        prompt (str) : the text of the batch.
+        instructions (str | SystemTranslationMessage | None) : the instructions of the batch.
+
+        Returns:
+        (asyncio.Future) : the request, resolving to the result of handle_translation().
+
+        """
+
+        self.num_batches += 1
+
+        instructions_text = instructions.content if isinstance(instructions, Message) else instructions
+
+        ## hashed, as a key per batch would otherwise keep a second copy of the whole text
+        batch_key = hashlib.sha256(f"{TranslationSession.normalize_batch(prompt)}\0{instructions_text}".encode('utf-8')).digest()
+
+        if(batch_key in self.original_requests):
+            self.num_duplicate_batches += 1
+            self.num_duplicate_entities += self.estimate_batch_tokens(prompt, instructions) if self.translation_method in ["openai", "gemini"] else len(prompt)
+
+            return asyncio.ensure_future(self.handle_duplicate_batch(batch_number, prompt, self.original_requests[batch_key]))
+
+        ## the message is only made once the batch is handed out
+        text_to_translate = ModelTranslationMessage(content=prompt) if self.translation_method == "openai" else prompt
+
+        request = asyncio.ensure_future(self.handle_translation(model, batch_number, text_to_translate, instructions))
+
+        ## a finished request holds on to the prompt and the whole result, which later duplicates don't need
+        def keep_translation(request:asyncio.Future) -> None:
+            if(not request.cancelled() and request.exception() is None):
+                original_batch_number, _, translated_message = request.result()
+                self.original_requests[batch_key] = (original_batch_number, translated_message)
+
+        request.add_done_callback(keep_translation)
+
+        self.original_requests[batch_key] = request
+
+        if(self.batch_job_task is not None):
+            self.batch_job_batches.append((batch_number, prompt, instructions_text))
+
+        return request
+
+##-------------------start-of-finish_building_batches()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def finish_building_batches(self) -> None:
+
+        """
+
+        Marks every batch as built and handed out, which lets the batch job start and fixes the number of batches.
+
+        """
+
+        self.batches_built.set()
+
+        line_statistics = LineClassifier.get_statistics(self.line_classes)
+
+        logging.debug(f"Classified {len(self.line_classes)} lines : {line_statistics['content']} content, {line_statistics['markers']} pov changes or part markers, {line_statistics['skipped']} punctuation, spacing or blank.")
+
+        logging.info(f"Built all {self.num_batches} batches.")
+
+        if(self.num_duplicate_batches > 0):
+            entity_word = "tokens" if self.translation_method in ["openai", "gemini"] else "characters"
+
+            logging.info(f"{self.num_duplicate_batches} batches are duplicates of earlier batches and will reuse their translations, saving {self.num_duplicate_batches} requests and roughly {self.num_duplicate_entities} {entity_word}.")
+
+##-------------------start-of-get_batch_count()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_batch_count(self) -> str:
+
+        """
+
+        Gets the number of batches for the logs, with a + while batches are still being built.
+
+        Returns:
+        (str) : the number of batches.
+
+        """
+
+        return str(self.num_batches) if self.batches_built.is_set() else f"{self.num_batches}+"
+
+##-------------------start-of-run_batch_job()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def run_batch_job(self, model:str) -> typing.Dict[int, str]:
+
+        """
+
+        Translates the batches through a single openai batch job, leaving out those the journal, translation memory or line memory already have.
+        The job is only submitted once every batch has been built, see batch_job_batches.
+        If the job can't be run, every batch is sent as a normal request instead.
+
+        Parameters:
+        model (string) : the model used to translate the text.
+
+        Returns:
+        results (dict) : batch number -> translation, for the batches the job translated.
+
+        """
+
+        sampling_settings = {
+            "temperature": self.openai_temperature,
+            "top_p": self.openai_top_p,
+            "stop": self.openai_stop,
+            "max_tokens": self.openai_max_tokens,
+            "presence_penalty": self.openai_presence_penalty,
+            "frequency_penalty": self.openai_frequency_penalty
+        }
+
+        await self.batches_built.wait()
+
+        requests = []
+
+        for batch_number, prompt, instructions in self.batch_job_batches:
+
+            if(self.translation_journal is not None and self.translation_journal.has(batch_number, prompt)):
+                continue
+
+            if(self.translation_memory is not None and self.translation_memory.get(TranslationMemory.make_key(text=prompt,
+                                                                                                              translation_method=self.translation_method,
+                                                                                                              model=model,
+                                                                                                              translation_instructions=instructions,
+                                                                                                              sampling_settings=sampling_settings)) is not None):
+                continue
+
+            if(self.line_memory is not None and await asyncio.to_thread(self.line_memory.can_assemble, [line for line in prompt.split('\n') if line.strip()])):
+                continue
+
+            requests.append(BatchJob.make_request(batch_number, model, str(instructions), prompt, sampling_settings))
+
+        if(len(requests) == 0):
+            return {}
+
+        try:
+            with open(FileEnsurer.openai_api_key_path, 'r', encoding='utf-8') as file:
+                api_key = base64.b64decode((file.read()).encode('utf-8')).decode('utf-8')
+
+            batch_job = BatchJob(api_key, job_path=self.batch_job_path, state_path=self.batch_job_state_path, poll_interval=self.openai_batch_poll_seconds)
+
+            logging.info(f"Sending {len(requests)} batches as an openai batch job, this can take up to {BatchJob.COMPLETION_WINDOW}...")
+
+            try:
+                return await batch_job.run(requests, resume=self.is_resuming)
+
+            finally:
+                await batch_job.close()
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logging.error(f"The batch job could not be run ({e}), sending the batches as normal requests instead.")
+            return {}
+
+##-------------------start-of-add_gender_context()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def add_gender_context(self, prompt:str, instructions:typing.Union[str, SystemTranslationMessage, None]) -> typing.Union[str, SystemTranslationMessage, None]:
+
+        """
+
+        Adds the genders of the characters in a batch to its instructions, if gender_context_insertion is on (llms only).
+
+        Parameters:
+        prompt (str) : the text of the batch.
+        instructions (str | SystemTranslationMessage | None) : the instructions of the batch.
+
+        Returns:
+        instructions (str | SystemTranslationMessage | None) : the instructions, with the genders added if there are any names in the batch.
+
+        """
+
+        if(not self.gender_context_insertion or self.translation_method not in ["openai", "gemini"]):
+            return instructions
+
+        ## the genders file may have been edited since the known names were looked up
+        GenderUtil.load_genders()
+
+        if(self.known_genders_version != GenderUtil.genders_version):
+            self.known_genders = {}
+            self.known_genders_version = GenderUtil.genders_version
+
+        ## sorted so the instructions (and the translation memory key) are the same from run to run
+        assumption = sorted(set(GenderUtil.get_gender_assumption_for_names(prompt, GenderUtil.find_potential_names(prompt), self.known_genders)))
+        assumption_string = "Additional Information:\nCharacter Genders:\n" + "".join(assumption) if len(assumption) > 0 else ""
+
+        return SystemTranslationMessage(content=f"{instructions.content if isinstance(instructions, Message) else instructions}\n{assumption_string}")
+
+##-------------------start-of-normalize_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def normalize_batch(prompt:str) -> str:
+
+        """
+
+        Normalizes a batch so trivially different copies (full-width vs half-width, spacing, blank lines) compare equal.
+
+        Parameters:
+        prompt (str) : the text of the batch.
+
+        Returns:
+        (str) : the normalized batch.
+
+        """
+
+        return "\n".join(LineMemory.normalize(line) for line in prompt.split('\n') if line.strip())
+
+##-------------------start-of-handle_duplicate_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def handle_duplicate_batch(self, batch_number:int, prompt:str, original_request:typing.Union[asyncio.Future, typing.Tuple[int, str]]) -> tuple[int, str, str]:
+
+        """
+
+        Waits for the translation of the batch this one duplicates and reuses it.
+
+        Parameters:
+        batch_number (int) : Which batch we are currently on.
+        prompt (str) : The text of the batch.
+        original_request (asyncio.Future | tuple[int, str]) : The request of the earlier, identical batch, or its batch number and translation if it's done.
+
+        Returns:
+        batch_number (int) : The batch index.
+        prompt (str) : The text of the batch.
+        translated_text (str) : The translated text.
+
+        """
+
+        batch_metrics = self.batch_metrics.start_batch(batch_number, prompt) if self.batch_metrics is not None else None
+
+        if(isinstance(original_request, asyncio.Future)):
+            ## shielded so a duplicate being cancelled doesn't cancel the batch every other duplicate is waiting on
+            original_batch_number, _, translated_message = await asyncio.shield(original_request)
+
+        else:
+            original_batch_number, translated_message = original_request
+
+        logging.info(f"Translation for batch {batch_number} of {self.get_batch_count()} reused from identical batch {original_batch_number}.")
+
+        self.batch_providers[batch_number] = "duplicate batch"
+
+        if(batch_metrics is not None):
+            self.batch_metrics.finish_batch(batch_metrics, "duplicate batch", "reused", translated_message)
+
+        return batch_number, prompt, translated_message
+
+##-------------------start-of-generate_text_to_translate_batches()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def generate_text_to_translate_batches(self, index:int) -> tuple[typing.List[str],int]:
+
+        """
+
+        Generates prompts for the messages meant for the API.
+
+        Parameters:
+        index (int) : An int representing where we currently are in the text file.
+
+        Returns:
+        prompt (list - string) : A list of Japanese lines that will be assembled into messages.
+        index (int) : An updated int representing where we currently are in the text file.
+
+        """
+
+        prompt = []
+        prompt_size = 0
+
+        while(index < len(self.text_to_translate)):
+
+            if(index >= len(self.line_classes)):
+                self.classify_more_lines()
+
+            ## pov changes and part markers are classified separately but still translated
+            if(self.line_classes[index] == LineClassifier.SKIP):
+                index += 1
+                continue
+
+            sentence = self.text_to_translate[index].strip()
+
+            if(self.number_of_tokens_per_batch is None):
+                sentence_size = 0
+                has_room = len(prompt) < self.number_of_lines_per_batch
+
+            else:
+                ## a line bigger than the whole budget still gets a batch of its own
+                sentence_size = self.estimate_line_size(sentence)
+                has_room = len(prompt) == 0 or prompt_size + sentence_size <= self.get_batch_size_budget()
+
+            if(not has_room):
+                return prompt, index
+
+            prompt.append(f'{sentence}\n')
+            prompt_size += sentence_size
+
+            index += 1
+
+        return prompt, index
+
+##-------------------start-of-get_batch_size_budget()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_batch_size_budget(self) -> int:
+
+        """
+
+        Gets how much a batch can hold when batching by number_of_tokens_per_batch, capped at what the translation method handles in one request.
+
+        Returns:
+        (int) : the budget, in tokens for llms and characters otherwise.
+
+        """
+
+        return min(self.number_of_tokens_per_batch or 0, TranslationSession.MAX_BATCH_SIZES[self.translation_method])
+
+##-------------------start-of-load_batch_tokenizer()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def load_batch_tokenizer(self) -> None:
+
+        """
+
+        Loads the tokenizer used to size batches, llms are sized in tokens while deepl and google translate are sized in characters.
+
+        """
+
+        self.batch_tokenizer = None
+
+        if(self.number_of_tokens_per_batch is None or self.translation_method not in ["openai", "gemini"]):
+            return
+
+        try:
+            import tiktoken
+
+            ## Gemini's tokenizer isn't available offline, OpenAI's is close enough for sizing batches
+            try:
+                self.batch_tokenizer = tiktoken.encoding_for_model(self.openai_model if self.translation_method == "openai" else "gpt-4")
+
+            except KeyError:
+                self.batch_tokenizer = tiktoken.get_encoding("cl100k_base")
+
+        except Exception as e:
+            ## japanese is roughly a token per character, so characters are a conservative stand-in
+            logging.warning(f"Could not load a tokenizer to size batches ({e}), sizing by characters instead.")
+
+##-------------------start-of-estimate_line_size()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def estimate_line_size(self, sentence:str) -> int:
+
+        """
+
+        Estimates how much of the batch budget a line takes up, including its newline.
+
+        Parameters:
+        sentence (str) : the line.
+
+        Returns:
+        (int) : the size, in tokens if a tokenizer is loaded and characters otherwise.
+
+        """
+
+        if(self.batch_tokenizer is not None):
+            return len(self.batch_tokenizer.encode_ordinary(sentence)) + 1
+
+        return len(sentence) + 1
+
+##-------------------start-of-classify_more_lines()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def classify_more_lines(self) -> None:
+
+        """
+
+        Classifies the next LINE_CLASSIFICATION_CHUNK_SIZE lines of the text, see LineClassifier.
+
+        """
+
+        num_classified_lines = len(self.line_classes)
+
+        self.line_classes.extend(LineClassifier.classify(self.text_to_translate[num_classified_lines:num_classified_lines + TranslationSession.LINE_CLASSIFICATION_CHUNK_SIZE]))
+
+##-------------------start-of-generate_translation_batches()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def generate_translation_batches(self) -> typing.Iterator[typing.Tuple[int, str]]:
+
+        """
+
+        Builds the batches one at a time, in the order of the text.
+        Only the number and text of a batch are yielded, the instructions are the same for every batch, see get_translation_instructions().
+
+        Yields:
+        batch_number (int) : the batch number.
+        prompt (str) : the text of the batch.
+
+        """
+
+        i = 0
+        batch_number = 0
+
+        while i < len(self.text_to_translate):
+
+            batch, i = self.generate_text_to_translate_batches(i)
+
+            batch_number += 1
+
+            yield batch_number, ''.join(batch)
+
+##-------------------start-of-get_translation_instructions()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_translation_instructions(self) -> typing.Union[str, SystemTranslationMessage, None]:
+
+        """
+
+        Gets the instructions sent with every batch for the specified service.
+
+        Returns:
+        (str | SystemTranslationMessage | None) : the system message for openai, the prompt for gemini, None for deepl, google translate and mock.
+
+        """
+
+        if(self.translation_method == 'openai'):
+            return SystemTranslationMessage(content=str(self.openai_system_message))
+
+        elif(self.translation_method == 'gemini'):
+            return self.gemini_prompt
+
+        return None
+
+##-------------------start-of-handle_cost_estimate_prompt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def handle_cost_estimate_prompt(self, model:str, omit_prompt:bool=False) -> str:
+
+        """
+
+        Handles the cost estimate prompt.
+
+        Parameters:
+        model (string) : the model used to translate the text.
+        omit_prompt (bool) : whether or not to omit the prompt.
+
+        Returns:
+        model (string) : the model used to translate the text.
+
+        """
+
+        translation_instructions_methods = {
+            "openai": self.openai_system_message,
+            "gemini": self.gemini_prompt,
+            "deepl": None,
+            "google translate": None,
+            "mock": None
+        }
+
+        translation_instructions = translation_instructions_methods[self.translation_method]
+
+        ## get cost estimate and confirm
+        ## counted in a thread since it goes over the whole text, which the batches no longer wait on
+        num_entities, min_cost, model = await asyncio.to_thread(self.estimate_cost, model, translation_instructions)
+
+        ## batch jobs are billed at half the price
+        if(self.translation_method == "openai" and self.openai_use_batch_api):
+            min_cost /= 2
+
+        print("Note that the cost estimate is not always accurate, and may be higher than the actual cost. However cost calculation now includes output tokens.\n")
+
+        if(self.translation_method == "gemini"):
+            logging.info(f"As of Kudasai {Toolkit.CURRENT_VERSION}, Gemini Pro 1.0 is free to use under 15 requests per minute, Gemini Pro 1.5 is free to use under 2 requests per minute. Requests correspond to number_of_current_batches in the translation settings.")
+
+            if(self.use_adaptive_concurrency):
+                logging.info(f"use_adaptive_concurrency is on, so up to {self.concurrency_limiter.max_limit} requests may be sent at a time.")
+
+        entity_word = "tokens" if self.translation_method in ["openai", "gemini"] else "characters"
+
+        logging.info(f"Estimated number of {entity_word} : " + str(num_entities))
+        logging.info("Estimated minimum cost : " + str(min_cost) + " USD")
+
+        if(not omit_prompt):
+            if(input("\nContinue? (1 for yes or 2 for no) : ") == "1"):
+                logging.info("User confirmed translation.")
+
+            else:
+                logging.info("User cancelled translation.")
+                FileEnsurer.exit_kudasai()
+
+        return model
+
+##-------------------start-of-estimate_cost()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def estimate_cost(self, model:str, translation_instructions:typing.Optional[str]) -> typing.Tuple[int, float, str]:
+
+        """
+
+        Estimates the cost of translating the text, see CostEstimator.estimate().
+        The lines are classified separately from line_classes, as this runs alongside the batches being built.
+
+        Parameters:
+        model (string) : the model used to translate the text.
+        translation_instructions (str | None) : the instructions sent with the batches.
+
+        Returns:
+        num_entities (int) : the number of tokens, or characters for deepl, google translate and mock.
+        min_cost (float) : the estimated minimum cost, in USD.
+        model (string) : the model used to translate the text.
+
+        """
+
+        ## only the lines that will actually be sent
+        lines_to_translate = [line for line, line_class in zip(self.text_to_translate, LineClassifier.classify(self.text_to_translate)) if line_class != LineClassifier.SKIP]
+
+        return CostEstimator.estimate(text=lines_to_translate, service=self.translation_method, model=model, translation_instructions=translation_instructions)
+
+##-------------------start-of-handle_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def handle_translation(self,
+                                 model:str,
+                                 batch_number:int,
+                                 text_to_translate:typing.Union[str, ModelTranslationMessage],
+                                 translation_instructions:typing.Union[str, SystemTranslationMessage, None]) -> tuple[int, str, str]:
+
+        """
+
+        Handles the translation requests for the specified service.
+
+        Parameters:
+        model (string) : The model of the service used to translate the text.
+        batch_number (int) : Which batch we are currently on.
+        text_to_translate (typing.Union[str, ModelTranslationMessage]) : The text to translate.
+        translation_instructions (typing.Union[str, SystemTranslationMessage, None]) : The translation instructions.
+
+        Returns:
+        batch_number (int) : The batch index.
+        text_to_translate (str) : The text to translate.
+        translated_text (str) : The translated text
+
+        """
+
+        translation_params = {
+            "openai": {
+                "text": text_to_translate,
+                "decorator": self.decorator_to_use,
+                "translation_instructions": translation_instructions,
+                "model": model,
+                "temperature": self.openai_temperature,
+                "top_p": self.openai_top_p,
+                "stop": self.openai_stop,
+                "max_tokens": self.openai_max_tokens,
+                "presence_penalty": self.openai_presence_penalty,
+                "frequency_penalty": self.openai_frequency_penalty
+            },
+            "gemini": {
+                "text": text_to_translate,
+                "decorator": self.decorator_to_use,
+                "model": model,
+                "temperature": self.gemini_temperature,
+                "top_p": self.gemini_top_p,
+                "top_k": self.gemini_top_k,
+                "stop_sequences": self.gemini_stop_sequences,
+                "max_output_tokens": self.gemini_max_output_tokens
+            },
+            "deepl": {
+                "text": text_to_translate,
+                "decorator": self.decorator_to_use,
+                "context": self.deepl_context,
+                "split_sentences": self.deepl_split_sentences,
+                "preserve_formatting": self.deepl_preserve_formatting,
+                "formality": self.deepl_formality
+            },
+            "google translate": {
+                "text": text_to_translate,
+                "decorator": self.decorator_to_use
+            },
+            "mock": {
+                "text": text_to_translate,
+                "decorator": self.decorator_to_use
+            }
+        }
+
+        prompt = text_to_translate.content if isinstance(text_to_translate, ModelTranslationMessage) else text_to_translate
+        prompt_lines = [line for line in prompt.split('\n') if line.strip()]
+
+        batch_metrics = self.batch_metrics.start_batch(batch_number, prompt) if self.batch_metrics is not None else None
+
+        ## batches completed by the run being resumed
+        if(self.translation_journal is not None):
+
+            journaled_translation = self.translation_journal.get(batch_number, prompt)
+
+            if(journaled_translation is not None):
+
+                logging.info(f"Translation for batch {batch_number} of {self.get_batch_count()} found in translation journal.")
+
+                self.batch_providers[batch_number] = "translation journal"
+
+                if(batch_metrics is not None):
+                    self.batch_metrics.finish_batch(batch_metrics, "translation journal", "reused", journaled_translation) # type: ignore
+
+                return batch_number, prompt, journaled_translation
+
+        memory_key = None
+
+        ## check the translation memory before spending a request (and a semaphore slot) on the batch
+        if(self.translation_memory is not None):
+
+            sampling_settings = {key: value for key, value in translation_params[self.translation_method].items() if key not in ["text", "decorator", "model", "translation_instructions"]}
+
+            memory_key = TranslationMemory.make_key(text=prompt,
+                                                    translation_method=self.translation_method,
+                                                    model=model,
+                                                    translation_instructions=translation_instructions.content if isinstance(translation_instructions, Message) else translation_instructions,
+                                                    sampling_settings=sampling_settings)
+
+            remembered_translation = self.translation_memory.get(memory_key)
+
+            if(remembered_translation is not None):
+
+                logging.info(f"Translation for batch {batch_number} of {self.get_batch_count()} found in translation memory.")
+
+                self.batch_providers[batch_number] = "translation memory"
+
+                if(batch_metrics is not None):
+                    self.batch_metrics.finish_batch(batch_metrics, "translation memory", "reused", remembered_translation) # type: ignore
+
+                return batch_number, prompt, remembered_translation
+
+        if(self.line_memory is not None):
+
+            ## hints can only be sent to methods that actually receive the instructions
+            can_send_hints = "translation_instructions" in translation_params[self.translation_method]
+
+            ## hashing and looking up every line is slow enough to hold up the other batches, so it's done off the event loop
+            reused_translation, hints = await asyncio.to_thread(self.line_memory.lookup_batch, prompt_lines, collect_hints=can_send_hints)
+
+            if(reused_translation is not None):
+
+                logging.info(f"Translation for batch {batch_number} of {self.get_batch_count()} assembled from line memory.")
+
+                self.batch_providers[batch_number] = "line memory"
+
+                if(batch_metrics is not None):
+                    self.batch_metrics.finish_batch(batch_metrics, "line memory", "reused", reused_translation) # type: ignore
+
+                return batch_number, prompt, reused_translation
+
+            if(len(hints) > 0):
+
+                hint_string = "Reference Translations:\n" + "".join(f"{source} : {translation}\n" for source, translation in hints[:TranslationSession.MAX_LINE_MEMORY_HINTS])
+
+                translation_params[self.translation_method]["translation_instructions"] = SystemTranslationMessage(content=f"{translation_instructions.content if isinstance(translation_instructions, Message) else translation_instructions}\n{hint_string}")
+
+        ## with a batch job, batches wait on it and are only sent as requests if it didn't translate them
+        batch_job_translation = (await asyncio.shield(self.batch_job_task)).get(batch_number) if self.batch_job_task is not None else None
+
+        queue_start = time.perf_counter()
+
+        ## Basically limits the number of concurrent batches
+        async with self.concurrency_limiter:
+            num_tries = 0
+            is_good_translation = False
+            is_untranslated = False
+
+            ## malformed unless it passes the check below
+            outcome = "malformed"
+
+            BatchMetrics.count("queue_wait", time.perf_counter() - queue_start)
+
+            ## while the main method is degraded, new batches skip straight to the failover method
+            if(self.failover_translation_method is not None and time.monotonic() < self.failover_until):
+                translation_method = self.failover_translation_method
+                params = self.get_failover_params(translation_params, prompt)
+
+            else:
+                translation_method = self.translation_method
+                params = translation_params[self.translation_method]
+
+            while True:
+
+                self.check_interrupt()
+
+                logging.info(f"Trying translation for batch {batch_number} of {self.get_batch_count()}...")
+
+                try:
+
+                    assert isinstance(params["text"], ModelTranslationMessage if translation_method == "openai" else str)
+
+                    ## the job's translation is checked like any other response, and resent as a request if it's malformed
+                    if(batch_job_translation is not None):
+                        logging.info(f"Translation for batch {batch_number} of {self.get_batch_count()} received from the batch job.")
+                        translated_message, batch_job_translation = batch_job_translation, None
+
+                    else:
+                        translated_message = await self.request_translation(params, translation_method)
+
+                ## will only occur if the max_batch_duration is exceeded, so we just return the untranslated text
+                except MaxBatchDurationExceededException:
+
+                    ## unless there is a failover method to send it to instead
+                    if(self.failover_translation_method is not None and translation_method != self.failover_translation_method):
+                        logging.warning(f"Batch {batch_number} of {self.get_batch_count()} stalled on {translation_method}, failing over to {self.failover_translation_method}...")
+
+                        self.failover_until = time.monotonic() + self.failover_after_seconds
+
+                        translation_method = self.failover_translation_method
+                        params = self.get_failover_params(translation_params, prompt)
+                        continue
+
+                    logging.error(f"Batch {batch_number} of {self.get_batch_count()} was not translated due to exceeding the max request duration, returning the untranslated text...")
+                    translated_message = prompt
+                    is_untranslated = True
+                    outcome = "untranslated"
+                    break
+
+                ## do not even bother if not a gpt 4 model, because gpt-3 seems unable to format properly
+                ## since gemini is free, we can just try again if it's malformed
+                ## deepl should produce properly formatted text so we don't need to check
+                if(translation_method == "openai" and "gpt-4" not in params["model"]):
+                    outcome = "unchecked"
+                    break
+
+                if(await TranslationSession.check_if_translation_is_good(translated_message, text_to_translate)): # type: ignore
+                    is_good_translation = True
+                    outcome = "translated"
+                    break
+
+                BatchMetrics.count("num_malformed")
+
+                ## rather than resending the whole batch, resend it in halves and only keep splitting the halves that come back malformed
+                if(self.bisect_malformed_batches and len(prompt_lines) > 1):
+                    logging.warning(f"Batch {batch_number} of {self.get_batch_count()} was malformed, splitting it...")
+                    self.num_occurred_malformed_batches += 1
+
+                    translated_message, is_good_translation = await self.bisect_batch(prompt_lines, params, f"{batch_number} of {self.get_batch_count()}", translation_method)
+                    outcome = "translated" if is_good_translation else "malformed"
+                    break
+
+                if(num_tries >= self.num_of_malform_retries):
+                    logging.warning(f"Batch {batch_number} of {self.get_batch_count()} was malformed but exceeded the max number of retries ({self.num_of_malform_retries})")
+                    break
+
+                else:
+                    num_tries += 1
+                    logging.warning(f"Batch {batch_number} of {self.get_batch_count()} was malformed, retrying...")
+                    self.num_occurred_malformed_batches += 1
+
+            if(isinstance(text_to_translate, ModelTranslationMessage)):
+                text_to_translate = text_to_translate.content
+
+            if(isinstance(translated_message, typing.List)):
+                translated_message = ''.join(translated_message) # type: ignore
+
+            ## only batches that passed the line count check are worth remembering, and the memory key is for the main method
+            if(is_good_translation and memory_key is not None and self.translation_memory is not None and translation_method == self.translation_method):
+                self.translation_memory.store(memory_key, translated_message) # type: ignore
+
+            ## same for the line memory, which only holds lines translated by the main method and model
+            if(is_good_translation and self.line_memory is not None and translation_method == self.translation_method):
+                await asyncio.to_thread(self.line_memory.learn, prompt_lines, [line for line in translated_message.split('\n') if line.strip()]) # type: ignore
+
+            ## untranslated batches are left out so a resumed run tries them again
+            if(not is_untranslated and self.translation_journal is not None):
+                self.translation_journal.record(batch_number, prompt, translated_message, translation_method=translation_method) # type: ignore
+
+            if(not is_untranslated):
+                self.batch_providers[batch_number] = translation_method
+
+            if(batch_metrics is not None):
+                self.batch_metrics.finish_batch(batch_metrics, translation_method, outcome, translated_message) # type: ignore
+
+            logging.info(f"Translation for batch {batch_number} of {self.get_batch_count()} completed by {translation_method}.")
+
+            return batch_number, text_to_translate, translated_message # type: ignore
+
+##-------------------start-of-get_failover_params()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_failover_params(self, translation_params:dict, prompt:str) -> dict:
+
+        """
+
+        Builds the parameters to send a batch to the failover method with.
+
+        Parameters:
+        translation_params (dict) : the parameters of every translation method for the batch.
+        prompt (str) : the text of the batch.
+
+        Returns:
+        params (dict) : the parameters for the failover method.
+
+        """
+
+        params = {**translation_params[self.failover_translation_method], "text": prompt, "decorator": self.failover_decorator}
+
+        if(self.failover_translation_method == "openai"):
+            params["text"] = ModelTranslationMessage(content=prompt)
+            params["model"] = self.openai_model
+
+            ## the main method's instructions are only reused if they were meant for openai in the first place
+            if(self.translation_method != "openai"):
+                params["translation_instructions"] = SystemTranslationMessage(content=str(self.openai_system_message))
+
+        elif(self.failover_translation_method == "gemini"):
+            params["model"] = self.gemini_model
+
+        return params
+
+##-------------------start-of-request_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def request_translation(self, params:dict, translation_method:typing.Optional[str]=None) -> typing.Union[str, typing.List[str]]:
+
+        """
+
+        Sends a single translation request, staying under the rate limits and reporting the latency of its successful attempt to the concurrency limiter.
+
+        Parameters:
+        params (dict) : the parameters for the translation method.
+        translation_method (str | optional | default=None) : the translation method to send it to, defaults to the main one.
+
+        Returns:
+        translated_message (typing.Union[str, typing.List[str]]) : the translated text.
+
+        """
+
+        translation_methods = {
+            "openai": EasyTL.openai_translate_async,
+            "gemini": EasyTL.gemini_translate_async,
+            "deepl": EasyTL.deepl_translate_async,
+            "google translate": EasyTL.googletl_translate_async,
+            "mock": MockProvider.translate_async
+        }
+
+        translation_method = translation_method or self.translation_method
+        is_main_method = translation_method == self.translation_method
+
+        rate_limiter = self.rate_limiter if is_main_method else self.failover_rate_limiter
+
+        if(rate_limiter.is_limited):
+            text = params["text"].content if isinstance(params["text"], Message) else params["text"]
+            await rate_limiter.wait(self.estimate_batch_tokens(text, params.get("translation_instructions"), translation_method) if rate_limiter.token_bucket is not None else 0)
+
+        ## each attempt is timed (and hedged) on its own, inside the retries, so the backoff sleeps between attempts aren't counted as latency
+        ## and a request that is already being retried isn't hedged, as that would only add load to a provider that is rate limiting
+        has_failed = False
+
+        def time_attempts(send_attempt:typing.Callable[..., typing.Awaitable]) -> typing.Callable[..., typing.Awaitable]:
+
+            @functools.wraps(send_attempt)
+            async def timed_attempt(*args, **kwargs):
+
+                nonlocal has_failed
+
+                attempt_start = time.perf_counter()
+
+                hedge_delay = self.get_hedge_delay() if is_main_method and not has_failed else None
+
+                try:
+                    if(hedge_delay is not None):
+                        result = await self.send_hedged_request(lambda: send_attempt(*args, **kwargs), hedge_delay, rate_limiter, params, translation_method)
+
+                    else:
+                        result = await send_attempt(*args, **kwargs)
+
+                except Exception:
+                    has_failed = True
+                    raise
+
+                latency = time.perf_counter() - attempt_start
+
+                BatchMetrics.count("request_latency", latency)
+
+                ## the limit is tuned to the main method, the failover method's latency would only skew it
+                if(is_main_method):
+                    self.concurrency_limiter.on_success(latency)
+
+                    bisect.insort(self.request_latencies, latency)
+
+                return result
+
+            return timed_attempt
+
+        decorator = params["decorator"]
+
+        translated_message = await translation_methods[translation_method](**{**params, "decorator": lambda send_attempt: decorator(time_attempts(send_attempt))})
+
+        BatchMetrics.count("num_requests")
+
+        return translated_message
+
+##-------------------start-of-get_hedge_delay()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_hedge_delay(self) -> typing.Optional[float]:
+
+        """
+
+        Gets how long a request to the main method may run before a duplicate is sent.
+
+        Returns:
+        hedge_delay (float | None) : the delay in seconds, or None if the request shouldn't be hedged (hedging is off, there are too few latencies to go by or the cap has been reached).
+
+        """
+
+        if(not self.hedge_slow_requests or len(self.request_latencies) < TranslationSession.MIN_HEDGE_SAMPLES):
+            return None
+
+        if(self.num_hedged_requests >= max(1, int(self.num_batches * self.max_hedged_request_fraction))):
+            return None
+
+        return self.request_latencies[int((len(self.request_latencies) - 1) * TranslationSession.HEDGE_PERCENTILE)]
+
+##-------------------start-of-send_hedged_request()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def send_hedged_request(self, send_request:typing.Callable[[], typing.Awaitable], hedge_delay:float, rate_limiter:RateLimiter, params:dict, translation_method:str) -> typing.Union[str, typing.List[str]]:
+
+        """
+
+        Sends a request, and if it is still running after hedge_delay, a duplicate of it. Whichever finishes first is used and the other is cancelled.
+
+        Parameters:
+        send_request (callable) : sends the request.
+        hedge_delay (float) : how long to wait before sending the duplicate, in seconds.
+        rate_limiter (RateLimiter) : the rate limiter the duplicate waits on.
+        params (dict) : the parameters of the request, for estimating its tokens.
+        translation_method (str) : the translation method of the request.
+
+        Returns:
+        translated_message (typing.Union[str, typing.List[str]]) : the translated text.
+
+        """
+
+        original = asyncio.ensure_future(send_request())
+
+        try:
+            done, _ = await asyncio.wait({original}, timeout=hedge_delay)
+
+        except asyncio.CancelledError:
+            original.cancel()
+            raise
+
+        ## the cap may have been reached by other requests in the meantime
+        if(len(done) > 0 or self.get_hedge_delay() is None):
+            return await original
+
+        self.num_hedged_requests += 1
+
+        BatchMetrics.count("num_requests")
+        BatchMetrics.count("num_hedged_requests")
+
+        logging.info(f"Request still running after {round(hedge_delay, 2)} seconds, sending a duplicate ({self.num_hedged_requests} so far)...")
+
+        async def send_duplicate():
+
+            if(rate_limiter.is_limited):
+                text = params["text"].content if isinstance(params["text"], Message) else params["text"]
+                await rate_limiter.wait(self.estimate_batch_tokens(text, params.get("translation_instructions"), translation_method) if rate_limiter.token_bucket is not None else 0)
+
+            return await send_request()
+
+        duplicate = asyncio.ensure_future(send_duplicate())
+
+        pending = {original, duplicate}
+
+        try:
+
+            ## a request that fails is only given up on if the other one fails too
+            while(True):
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                winner = next((task for task in done if task.exception() is None), None)
+
+                if(winner is not None):
+                    break
+
+                if(len(pending) == 0):
+                    return await original
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+        ## the original is cancelled, so how much sooner the duplicate finished can't be known
+        if(winner is duplicate):
+            self.num_won_hedges += 1
+
+        return winner.result()
+
+##-------------------start-of-bisect_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def bisect_batch(self, lines:typing.List[str], params:dict, batch_name:str, translation_method:typing.Optional[str]=None) -> tuple[str, bool]:
+
+        """
+
+        Translates a malformed batch again as two halves, recursing into any half that also comes back malformed.
+
+        Parameters:
+        lines (list - str) : the non-blank lines of the batch.
+        params (dict) : the parameters the batch was sent with, the text is replaced for each half.
+        batch_name (str) : the batch being split, for logging.
+        translation_method (str | optional | default=None) : the translation method the batch was sent to, defaults to the main one.
+
+        Returns:
+        translated_message (str) : the translations of the halves, joined back together in order.
+        is_good_translation (bool) : whether every half came back with the right number of lines.
+
+        """
+
+        translation_method = translation_method or self.translation_method
+
+        self.num_batch_splits += 1
+
+        middle = len(lines) // 2
+
+        translated_halves = []
+        is_good_translation = True
+
+        ## halves are sent one after the other, as they share the concurrency slot of the original batch
+        for half_name, half in [(f"{batch_name} (first half)", lines[:middle]), (f"{batch_name} (second half)", lines[middle:])]:
+
+            half_text = ''.join(f'{line}\n' for line in half)
+            half_params = {**params, "text": ModelTranslationMessage(content=half_text) if translation_method == "openai" else half_text}
+
+            num_tries = 0
+
+            while True:
+
+                self.check_interrupt()
+
+                try:
+                    translated_half = await self.request_translation(half_params, translation_method)
+
+                except MaxBatchDurationExceededException:
+                    logging.error(f"Batch {half_name} was not translated due to exceeding the max request duration, returning the untranslated text...")
+                    translated_half, is_good_half = half_text, False
+                    break
+
+                if(isinstance(translated_half, typing.List)):
+                    translated_half = ''.join(translated_half)
+
+                if(await TranslationSession.check_if_translation_is_good(translated_half, half_text)):
+                    is_good_half = True
+                    break
+
+                BatchMetrics.count("num_malformed")
+
+                if(len(half) > TranslationSession.MIN_BISECT_LINES):
+                    logging.warning(f"Batch {half_name} was malformed, splitting it...")
+                    translated_half, is_good_half = await self.bisect_batch(half, params, half_name, translation_method)
+                    break
+
+                if(num_tries >= self.num_of_malform_retries):
+                    logging.warning(f"Batch {half_name} was malformed but exceeded the max number of retries ({self.num_of_malform_retries})")
+                    is_good_half = False
+                    break
+
+                num_tries += 1
+                logging.warning(f"Batch {half_name} was malformed, retrying...")
+
+            translated_halves.append(translated_half.strip('\n'))
+            is_good_translation = is_good_translation and is_good_half
+
+        return '\n'.join(translated_halves), is_good_translation
+
+##-------------------start-of-estimate_batch_tokens()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def estimate_batch_tokens(self, prompt:str, translation_instructions:typing.Union[str, SystemTranslationMessage, None], translation_method:typing.Optional[str]=None) -> int:
+
+        """
+
+        Estimates how many tokens a batch will use against the tokens per minute limit, input and output.
+
+        Parameters:
+        prompt (str) : the text of the batch.
+        translation_instructions (typing.Union[str, SystemTranslationMessage, None]) : the instructions sent with the batch.
+        translation_method (str | optional | default=None) : the translation method the batch is sent to, defaults to the main one.
+
+        Returns:
+        (int) : the estimated number of tokens.
+
+        """
+
+        translation_instructions = translation_instructions.content if isinstance(translation_instructions, Message) else translation_instructions
+
+        ## Gemini's tokenizer isn't available offline, OpenAI's is close enough for pacing
+        model = self.openai_model if (translation_method or self.translation_method) == "openai" else None
+
+        ## the instructions are the same for most batches, the batches themselves are only counted once
+        num_input_tokens = CostEstimator.count_tokens(translation_instructions or self.gemini_prompt, model) + CostEstimator.count_tokens(prompt, model, use_cache=False)
+
+        ## a translation is roughly as long as its source, so the output is counted as the input again
+        return num_input_tokens * 2
+
+##-------------------start-of-check_if_translation_is_good()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def check_if_translation_is_good(translated_message:typing.Union[typing.List[str], str], text_to_translate:typing.Union[ModelTranslationMessage, str]) -> bool:
+
+        """
+
+        Checks if the translation is good, i.e. the number of lines in the prompt and the number of lines in the translated message are the same.
+
+        Parameters:
+        translated_message (str) : the translated message.
+        text_to_translate (typing.Union[str, Message]) : the translation prompt.
+
+        Returns:
+        is_valid (bool) : whether or not the translation is valid.
+
+        """
+
+        if(not isinstance(text_to_translate, str)):
+            prompt = text_to_translate.content
+
+        else:
+            prompt = text_to_translate
+
+        if(isinstance(translated_message, list)):
+            translated_message = ''.join(translated_message)
+
+        jap = [line for line in prompt.split('\n') if line.strip()]  ## Remove blank lines
+        eng = [line for line in translated_message.split('\n') if line.strip()]  ## Remove blank lines
+
+        return len(jap) == len(eng)
+
+##-------------------start-of-write_preview()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def write_preview(self, preview_results:typing.Dict[int, tuple[int, str, str]]) -> None:
+
+        """
+
+        Writes the translated text of the preview batches, in the order of the text.
+
+        Parameters:
+        preview_results (dict) : batch number -> result of handle_translation(), for every preview batch.
+
+        """
+
+        with open(self.preview_text_path, 'w', encoding='utf-8') as file:
+            for batch_number in sorted(preview_results):
+                file.writelines(self.fragment_translation(preview_results[batch_number][2]))
+
+        logging.info(f"Preview of the first {len(preview_results)} batches to be sent has been written to : {self.preview_text_path}")
+
+##-------------------start-of-redistribute()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def redistribute(self, text_to_translate:typing.Union[Message, str], translated_message:str) -> None:
+
+        """
+
+        Puts translated text back into the text file.
+
+        Parameters:
+        text_to_translate (typing.Union[str, Message]) : the translation prompt.
+        translated_message (str) : the translated message.
+
+        """
+
+        if(not isinstance(text_to_translate, str)):
+            prompt = text_to_translate.content
+
+        else:
+            prompt = text_to_translate
+
+        ## Separates with hyphens if the mode is 1
+        if(self.je_check_mode == 1):
+
+            self.je_check_text.append("\n-------------------------\n"+ prompt + "\n\n")
+            self.je_check_text.append(translated_message + '\n')
+
+        ## Mode two tries to pair the text for j-e checking, see fix_je() for more details
+        elif(self.je_check_mode == 2):
+            self.je_check_text.append(prompt)
+            self.je_check_text.append(translated_message)
+
+        self.translated_text.extend(self.fragment_translation(translated_message))
+
+##-------------------start-of-fragment_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def fragment_translation(self, translated_message:str) -> typing.List[str]:
+
+        """
+
+        Splits a translated message into the lines of the translated text, according to the sentence fragmenter mode.
+
+        Parameters:
+        translated_message (str) : the translated message.
+
+        Returns:
+        translated_lines (list - str) : the lines of the translated text.
+
+        """
+
+        translated_lines = []
+
+        ## mode 1 is the default mode, uses regex and other nonsense to split sentences
+        ## a single pass over the batch, quotes spanning several sentences are stitched back together as they close
+        if(self.sentence_fragmenter_mode == 1):
+
+            build_string = None
+
+            for match in TranslationSession.SENTENCE_PATTERN.finditer(translated_message):
+
+                sentence = match.group(1)
+
+                if(sentence.startswith("\"") and not sentence.endswith("\"") and build_string is None):
+                    build_string = sentence
+                    continue
+                elif(not sentence.startswith("\"") and sentence.endswith("\"") and build_string is not None):
+                    translated_lines.append(f"{build_string} {sentence}\n")
+                    build_string = None
+                    continue
+                elif(build_string is not None):
+                    build_string += f" {sentence}"
+                    continue
+
+                translated_lines.append(sentence + '\n')
+
+            ## a quote that never closes is still kept
+            if(build_string is not None):
+                translated_lines.append(build_string + '\n')
+
+        ## mode 2 just assumes the translation method formatted it properly
+        elif(self.sentence_fragmenter_mode == 2):
+
+            translated_lines.append(translated_message)
+
+        return translated_lines
+
+##-------------------start-of-fix_je()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def fix_je(self) -> typing.List[str]:
+
+        """
+
+        Fixes the J->E text to be more j-e checker friendly.
+
+        Note that fix_je() is not always accurate, and may use standard j-e formatting instead of the corrected formatting.
+
+        Returns:
+        final_list (list - str) : the 'fixed' J->E text.
+
+        """
+
+        i = 1
+        final_list = []
+
+        while(i < len(self.je_check_text)):
+            final_list.extend(TranslationSession.fix_je_pair(self.je_check_text[i-1], self.je_check_text[i]))
+            i += 2
+
+        return final_list
+
+##-------------------start-of-fix_je_pair()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def fix_je_pair(japanese_text:str, english_text:str) -> typing.List[str]:
+
+        """
+
+        Fixes the J->E text of a single batch, see fix_je() for more details.
+
+        Parameters:
+        japanese_text (str) : the japanese text of the batch.
+        english_text (str) : the translated text of the batch.
+
+        Returns:
+        final_list (list - str) : the 'fixed' J->E text of the batch.
+
+        """
+
+        jap = [line for line in japanese_text.split('\n') if(line.strip())]  # Remove blank lines
+        eng = [line for line in english_text.split('\n') if(line.strip())]  # Remove blank lines
+
+        final_list = ["-------------------------\n"]
+
+        if(len(jap) == len(eng)):
+            for(jap_line, eng_line) in zip(jap, eng):
+                if(jap_line and eng_line):  # check if jap_line and eng_line aren't blank
+                    final_list.append(jap_line + '\n\n')
+                    final_list.append(eng_line + '\n\n')
+                    final_list.append("--------------------------------------------------\n")
+        else:
+            final_list.append(japanese_text + '\n\n')
+            final_list.append(english_text + '\n\n')
+            final_list.append("--------------------------------------------------\n")
+
+        return final_list
+
+##-------------------start-of-assemble_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def assemble_results(self, time_start:float, time_end:float) -> str:
+
+        """
+
+        Generates the translation print result of the session, and sets self.translation_print_result to it.
+
+        Parameters:
+        time_start (float) : When the translation started.
+        time_end (float) : When the translation finished.
+
+        Returns:
+        translation_print_result (str) : The translation print result.
+
+        """
+
+        memory_hits, memory_misses = (self.translation_memory.num_hits, self.translation_memory.num_misses) if self.translation_memory is not None else (0, 0)
+        reused_lines, hinted_lines = (self.line_memory.num_reused_lines, self.line_memory.num_hinted_lines) if self.line_memory is not None else (0, 0)
+        resumed_batches = self.translation_journal.num_resumed_batches if self.translation_journal is not None else 0
+        entity_word = "tokens" if self.translation_method in ["openai", "gemini"] else "characters"
+        failed_over_batches = sum(1 for provider in self.batch_providers.values() if provider == self.failover_translation_method)
+        limiter = self.concurrency_limiter
+        rate_limit_wait_time = Toolkit.get_elapsed_time(0, self.rate_limiter.total_wait_time)
+
+        self.translation_print_result = (
+            f"Time Elapsed : {Toolkit.get_elapsed_time(time_start, time_end)}\n"
+            f"Number of malformed batches : {self.num_occurred_malformed_batches}\n"
+            f"Number of malformed batch splits : {self.num_batch_splits}\n"
+            f"Translation memory hits : {memory_hits}, misses : {memory_misses}\n"
+            f"Line memory reused lines : {reused_lines}, hinted lines : {hinted_lines}\n"
+            f"Batches resumed from journal : {resumed_batches}\n"
+            f"Batches served by failover method : {failed_over_batches}\n"
+            f"Duplicate batches reused within the run : {self.num_duplicate_batches}, estimated {entity_word} saved : {self.num_duplicate_entities}\n"
+            f"Hedged requests : {self.num_hedged_requests}, won by the duplicate : {self.num_won_hedges}\n"
+            f"Concurrency limit : {limiter.current_limit} (started at {limiter.initial_limit}, lowest {limiter.lowest_limit}, highest {limiter.highest_limit}, lowered {limiter.num_decreases} times)\n"
+            f"Time spent waiting on rate limits : {rate_limit_wait_time}\n\n"
+            f"Debug text have been written to : {FileEnsurer.debug_log_path}\n"
+            f"J->E text have been written to : {self.je_check_path}\n"
+            f"Translated text has been written to : {self.translated_text_path}\n"
+            f"Batch metrics have been written to : {self.batch_metrics_path} and {self.batch_metrics_prometheus_path}\n"
+            f"Errors have been written to : {FileEnsurer.error_log_path}\n"
+        )
+
+        return self.translation_print_result
@@ -0,0 +1,96 @@
+## built-in libraries
+from pathlib import Path
+
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+
+## Calculates the path to the modules directory and add it to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+
+## Add the parent directory to sys.path so 'modules' can be found
+sys.path.append(str(parent_dir))
+
+## custom modules
+from modules.common.line_memory import LineMemory
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+
+def make_line(rng:random.Random) -> str:
+    """Makes a random line of kana, long enough to be remembered."""
+    return "".join(rng.choice(KANA) for _ in range(rng.randint(12, 40))) + "。"
+
+def perturb(line:str, rng:random.Random) -> str:
+    """Changes a single character of a line, the kind of difference a recap usually has."""
+    index = rng.randrange(len(line) - 1)
+    return line[:index] + rng.choice(KANA) + line[index + 1:]
+
+def make_synthetic_volumes(num_volumes:int=10, lines_per_volume:int=3000, seed:int=0) -> list:
+    """Makes volumes that share an opening, recap part of the previous volume and are otherwise new."""
+    rng = random.Random(seed)
+    opening = [make_line(rng) for _ in range(50)]
+    volumes = []
+
+    for _ in range(num_volumes):
+        recap = [perturb(line, rng) for line in rng.sample(volumes[-1], min(300, len(volumes[-1])))] if volumes else []
+        new_lines = [make_line(rng) for _ in range(lines_per_volume - len(opening) - len(recap))]
+        volumes.append(opening + recap + new_lines)
+
+    return volumes
+
+def load_volumes(directory:str) -> list:
+    """Loads every .txt file in a directory as a volume, in name order."""
+    volumes = []
+
+    for file_name in sorted(os.listdir(directory)):
+        if(file_name.endswith(".txt")):
+            with open(os.path.join(directory, file_name), 'r', encoding='utf-8') as file:
+                volumes.append([line.strip() for line in file if line.strip()])
+
+    return volumes
+
+def run_benchmark(volumes:list) -> None:
+    """Translates (fakes) the volumes in order through a fresh line memory, reporting how much each one gets from the previous ones."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+
+        tracemalloc.start()
+
+        memory = LineMemory("benchmark", "benchmark", os.path.join(temp_dir, "line_memory.db"))
+
+        print(f"{'volume':>6} {'lines':>7} {'exact':>7} {'similar':>8} {'hit rate':>9} {'lookup ms/line':>15} {'index MiB':>10}")
+
+        for volume_number, volume in enumerate(volumes, start=1):
+
+            num_exact = num_similar = 0
+            start = time.perf_counter()
+
+            for line in volume:
+                match = memory.lookup(line)
+
+                if(match is not None):
+                    if(match[2] == 1.0):
+                        num_exact += 1
+                    else:
+                        num_similar += 1
+
+            elapsed = time.perf_counter() - start
+
+            memory.learn(volume, [f"EN {line}" for line in volume])
+
+            current_size, _ = tracemalloc.get_traced_memory()
+
+            print(f"{volume_number:>6} {len(volume):>7} {num_exact:>7} {num_similar:>8} {(num_exact + num_similar) / max(len(volume), 1):>9.1%} {elapsed * 1000 / max(len(volume), 1):>15.3f} {current_size / (1024 * 1024):>10.2f}")
+
+        memory.close()
+        tracemalloc.stop()
+
+if __name__ == "__main__":
+    if(len(sys.argv) > 2):
+        print("Usage: python line_memory_benchmark.py [directory_of_volumes]")
+        sys.exit(1)
+
+    run_benchmark(load_volumes(sys.argv[1]) if len(sys.argv) == 2 else make_synthetic_volumes())
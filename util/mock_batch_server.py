@@ -0,0 +1,177 @@
+## built-in libraries
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import sys
+import json
+import time
+import email
+import asyncio
+import argparse
+import threading
+
+## Calculates the path to the modules directory and add it to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+
+## Add the parent directory to sys.path so 'modules' can be found
+sys.path.append(str(parent_dir))
+
+## custom modules
+from modules.common.mock_provider import MockProvider
+from modules.common.exceptions import MockProviderError
+
+class MockBatchServer:
+
+    """
+
+    A local stand-in for the parts of OpenAI's Batch API Kudasai uses (uploading a file, creating a batch, checking on it and downloading its output), to test openai_use_batch_api without an account.
+    Each request of a job is "translated" by MockProvider, so its settings (malformed responses, rate limits and so on) apply to the requests of the job as well.
+    Point Kudasai at it with OPENAI_BASE_URL=http://localhost:<port>/v1, any API key will do.
+
+    """
+
+    ## file id -> content
+    files:dict = {}
+
+    ## batch id -> batch
+    batches:dict = {}
+
+    ## how long a batch stays in progress, in seconds
+    completion_delay = 5.0
+
+    lock = threading.Lock()
+
+##-------------------start-of-process_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def process_batch(batch:dict) -> None:
+
+        """
+
+        Runs every request of a batch through the mock, and writes the output and error files.
+
+        Parameters:
+        batch (dict) : The batch.
+
+        """
+
+        outputs, errors = [], []
+
+        for line in MockBatchServer.files[batch["input_file_id"]].decode('utf-8').splitlines():
+
+            if(not line.strip()):
+                continue
+
+            request = json.loads(line)
+            prompt = "\n".join(message["content"] for message in request["body"]["messages"] if message["role"] == "user")
+
+            try:
+                content = asyncio.run(MockProvider.handle_request(prompt))
+                outputs.append({"id": f"response-{request['custom_id']}", "custom_id": request["custom_id"], "response": {"status_code": 200, "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]}}, "error": None})
+
+            except MockProviderError as e:
+                errors.append({"id": f"response-{request['custom_id']}", "custom_id": request["custom_id"], "response": {"status_code": e.status_code, "body": {"error": {"message": e.message}}}, "error": None})
+
+        for kind, results in [("output", outputs), ("error", errors)]:
+            if(len(results) > 0):
+                file_id = f"file-{len(MockBatchServer.files) + 1}"
+                MockBatchServer.files[file_id] = "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results).encode('utf-8')
+                batch[f"{kind}_file_id"] = file_id
+
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+
+##-------------------start-of-MockBatchRequestHandler---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class MockBatchRequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, body:dict, status_code:int=200) -> None:
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def get_path(self) -> list:
+        """Splits the path, without the /v1 prefix the client may or may not send."""
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        return parts[1:] if parts[:1] == ["v1"] else parts
+
+    def do_POST(self) -> None:
+        path = self.get_path()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        with MockBatchServer.lock:
+
+            if(path == ["files"]):
+                ## the file comes as multipart form data
+                message = email.message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + body)
+                content = next(part.get_payload(decode=True) for part in message.walk() if part.get_filename() is not None)
+
+                file_id = f"file-{len(MockBatchServer.files) + 1}"
+                MockBatchServer.files[file_id] = content
+
+                self.send_json({"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()), "filename": "batch_job.jsonl", "purpose": "batch", "status": "processed"})
+
+            elif(path == ["batches"]):
+                request = json.loads(body)
+
+                if(request.get("input_file_id") not in MockBatchServer.files):
+                    self.send_json({"error": {"message": "No such file."}}, 404)
+                    return
+
+                batch_id = f"batch-{len(MockBatchServer.batches) + 1}"
+                MockBatchServer.batches[batch_id] = {"id": batch_id, "object": "batch", "endpoint": request["endpoint"], "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                                                     "status": "in_progress", "created_at": int(time.time()), "output_file_id": None, "error_file_id": None, "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+
+                self.send_json(MockBatchServer.batches[batch_id])
+
+            else:
+                self.send_json({"error": {"message": "Not found."}}, 404)
+
+    def do_GET(self) -> None:
+        path = self.get_path()
+
+        with MockBatchServer.lock:
+
+            if(len(path) == 2 and path[0] == "batches" and path[1] in MockBatchServer.batches):
+                batch = MockBatchServer.batches[path[1]]
+
+                if(batch["status"] == "in_progress" and time.time() - batch["created_at"] >= MockBatchServer.completion_delay):
+                    MockBatchServer.process_batch(batch)
+
+                self.send_json(batch)
+
+            elif(len(path) == 3 and path[0] == "files" and path[2] == "content" and path[1] in MockBatchServer.files):
+                content = MockBatchServer.files[path[1]]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            else:
+                self.send_json({"error": {"message": "Not found."}}, 404)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="A local stand-in for OpenAI's Batch API, backed by the mock translation method.")
+    parser.add_argument("--port", type=int, default=8765, help="The port to listen on.")
+    parser.add_argument("--delay", type=float, default=5.0, help="How long each batch stays in progress, in seconds.")
+    parser.add_argument("--mock-settings", default=None, help="A mock_provider_settings.json, by default every request succeeds instantly.")
+
+    arguments = parser.parse_args()
+
+    if(arguments.mock_settings is not None):
+        MockProvider.load_settings(arguments.mock_settings)
+
+    else:
+        MockProvider.configure(latency_distribution="constant", mean_latency=0.0)
+
+    MockBatchServer.completion_delay = arguments.delay
+
+    print(f"Listening on http://localhost:{arguments.port}/v1, set OPENAI_BASE_URL to it.")
+
+    ThreadingHTTPServer(("localhost", arguments.port), MockBatchRequestHandler).serve_forever()
@@ -0,0 +1,173 @@
+## built-in libraries
+from pathlib import Path
+
+import os
+import io
+import sys
+import copy
+import time
+import typing
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import itertools
+import contextlib
+import multiprocessing
+
+## Calculates the path to the modules directory and add it to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+
+## Add the parent directory to sys.path so 'modules' can be found
+sys.path.append(str(parent_dir))
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+
+def make_line(rng:random.Random) -> str:
+    """Makes a random line of kana, sometimes a quote and sometimes more than one sentence."""
+    line = "。".join("".join(rng.choice(KANA) for _ in range(rng.randint(8, 30))) for _ in range(rng.randint(1, 3))) + "。"
+    return f"「{line}」" if rng.random() < 0.3 else line
+
+def make_corpus(target_size:int, seed:int=0) -> list:
+    """Makes lines until they add up to target_size bytes of utf-8, with the odd blank line like a real novel."""
+    rng = random.Random(seed)
+    lines = []
+    total_size = 0
+
+    while(total_size < target_size):
+        line = make_line(rng) if rng.random() > 0.1 else ""
+        lines.append(line)
+        total_size += len(line.encode('utf-8')) + 1
+
+    return lines
+
+def get_peak_rss() -> float:
+    """Gets the peak resident set size of this process in MiB, -1 where the resource module isn't available (Windows)."""
+    try:
+        import resource
+
+    except ImportError:
+        return -1
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    ## kilobytes on linux, bytes on macos
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+def percentile(values:list, quantile:float) -> float:
+    """Gets a quantile of the values, 0 if there are none."""
+    values = sorted(values)
+    return values[int((len(values) - 1) * quantile)] if values else 0.0
+
+def run_configuration(configuration:dict, results:multiprocessing.Queue) -> None:
+    """Translates a synthetic corpus with the mock method through Translator.commence_translation(), in its own process so its peak memory is its own."""
+    ## custom modules
+    from modules.common.file_ensurer import FileEnsurer
+    from modules.common.mock_provider import MockProvider
+    from modules.common.translator import Translator
+    from modules.common.toolkit import Toolkit
+
+    from handlers.json_handler import JsonHandler
+
+    logging.disable(logging.WARNING)
+
+    ## the run clears the console as it goes, which would wipe the table
+    Toolkit.clear_console = staticmethod(lambda: None) # type: ignore
+
+    lines = make_corpus(configuration["size"], configuration["seed"])
+
+    if(configuration["mock_settings_path"] is not None):
+        MockProvider.load_settings(configuration["mock_settings_path"])
+
+    else:
+        MockProvider.configure(latency_distribution="constant", mean_latency=configuration["latency"], seed=configuration["seed"])
+
+    settings = copy.deepcopy(FileEnsurer.DEFAULT_TRANSLATION_SETTING)
+    settings["base translation settings"].update({
+        "number_of_lines_per_batch": configuration["lines_per_batch"],
+        "number_of_concurrent_batches": configuration["concurrent_batches"],
+        "sentence_fragmenter_mode": configuration["fragmenter_mode"],
+        "use_translation_memory": False,
+        "use_line_memory": False
+    })
+
+    JsonHandler.current_translation_settings = settings
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+
+        ## the run's output goes to the temporary directory rather than over the last real one
+        FileEnsurer.output_dir = temp_dir
+
+        Translator.TRANSLATION_METHOD = "mock"
+        Translator.text_to_translate = lines
+
+        ## as would its console output
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            asyncio.run(Translator.commence_translation(is_webgui=True))
+            elapsed = time.perf_counter() - start
+
+    session = Translator.session
+
+    batch_latencies = [batch["finished_at"] - batch["started_at"] for batch in session.batch_metrics.batches] # type: ignore
+
+    results.put({
+        **configuration,
+        "lines": len(lines),
+        "batches": session.num_batches, # type: ignore
+        "seconds": elapsed,
+        "lines_per_second": len(lines) / elapsed,
+        "batches_per_second": session.num_batches / elapsed, # type: ignore
+        "peak_rss": get_peak_rss(),
+        "p50": percentile(batch_latencies, 0.5),
+        "p99": percentile(batch_latencies, 0.99)
+    })
+
+def run_benchmark(sizes:list, lines_per_batch:list, concurrent_batches:list, fragmenter_modes:list, latency:float, mock_settings_path:typing.Optional[str], seed:int) -> None:
+    """Runs every combination of the settings over every corpus size, one process per run, and reports throughput, peak memory and batch latency."""
+    print(f"{'size MiB':>8} {'lines/batch':>11} {'concurrent':>10} {'fragmenter':>10} {'lines':>8} {'batches':>8} {'seconds':>8} {'lines/s':>10} {'batches/s':>10} {'peak RSS MiB':>12} {'p50 ms':>8} {'p99 ms':>8}")
+
+    context = multiprocessing.get_context("spawn")
+
+    for size, num_lines, num_concurrent, fragmenter_mode in itertools.product(sizes, lines_per_batch, concurrent_batches, fragmenter_modes):
+
+        configuration = {
+            "size": size,
+            "lines_per_batch": num_lines,
+            "concurrent_batches": num_concurrent,
+            "fragmenter_mode": fragmenter_mode,
+            "latency": latency,
+            "mock_settings_path": mock_settings_path,
+            "seed": seed
+        }
+
+        results = context.Queue()
+        process = context.Process(target=run_configuration, args=(configuration, results))
+        process.start()
+
+        ## the result is small enough to be sent before the process exits
+        process.join()
+
+        if(results.empty()):
+            print(f"The run with {configuration} failed, see the error above.")
+            continue
+
+        result = results.get()
+
+        print(f"{result['size'] / (1024 * 1024):>8.2f} {num_lines:>11} {num_concurrent:>10} {fragmenter_mode:>10} {result['lines']:>8} {result['batches']:>8} {result['seconds']:>8.2f} {result['lines_per_second']:>10.0f} {result['batches_per_second']:>10.1f} {result['peak_rss']:>12.1f} {result['p50'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the whole translation pipeline offline, with the mock translation method.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.1, 1, 10], help="Corpus sizes in MiB.")
+    parser.add_argument("--lines-per-batch", type=int, nargs="+", default=[12, 36, 72], help="Values of number_of_lines_per_batch.")
+    parser.add_argument("--concurrent-batches", type=int, nargs="+", default=[5, 20], help="Values of number_of_concurrent_batches.")
+    parser.add_argument("--fragmenter-modes", type=int, nargs="+", default=[1, 2], help="Values of sentence_fragmenter_mode.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency of every mock request in seconds, 0 to measure Kudasai alone.")
+    parser.add_argument("--mock-settings", default=None, help="A mock_provider_settings.json to use instead of --latency.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus and the mock.")
+
+    arguments = parser.parse_args()
+
+    run_benchmark([int(size * 1024 * 1024) for size in arguments.sizes], arguments.lines_per_batch, arguments.concurrent_batches, arguments.fragmenter_modes, arguments.latency, arguments.mock_settings, arguments.seed)
@@ -0,0 +1,74 @@
+## built-in libraries
+from pathlib import Path
+
+import sys
+import time
+import random
+
+## Calculates the path to the modules directory and add it to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+
+## Add the parent directory to sys.path so 'modules' can be found
+sys.path.append(str(parent_dir))
+
+## custom modules
+from modules.common.translation_session import TranslationSession
+
+WORDS = ["the", "of", "class", "student", "said", "Ayanokouji", "Horikita", "was", "looking", "at", "me", "and", "I", "couldn't", "help", "but", "wonder", "why", "school", "test"]
+
+def make_sentence(rng:random.Random) -> str:
+    """Makes a random English sentence, sometimes a quote spanning more than one sentence."""
+    sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 18))).capitalize() + rng.choice([".", "!", "?", "..."])
+
+    if(rng.random() < 0.3):
+        return f"\"{sentence} {make_sentence(rng)}\"" if rng.random() < 0.5 else f"\"{sentence}\""
+
+    return sentence
+
+def make_batches(target_size:int, lines_per_batch:int=36, seed:int=0) -> list:
+    """Makes translated batches until they add up to target_size characters."""
+    rng = random.Random(seed)
+    batches = []
+    total_size = 0
+
+    while(total_size < target_size):
+        batch = "\n".join(make_sentence(rng) for _ in range(lines_per_batch))
+        batches.append(batch)
+        total_size += len(batch)
+
+    return batches
+
+def run_benchmark(target_size:int=5 * 1024 * 1024, num_buckets:int=10) -> None:
+    """Runs the batches through TranslationSession.redistribute() in sentence_fragmenter_mode 1, reporting the average per-batch cost as the translated text grows."""
+    batches = make_batches(target_size)
+
+    session = TranslationSession("deepl", [])
+    session.sentence_fragmenter_mode = 1
+    session.je_check_mode = 1
+
+    bucket_size = max(len(batches) // num_buckets, 1)
+    timings = []
+
+    start = time.perf_counter()
+
+    for batch in batches:
+        batch_start = time.perf_counter()
+        session.redistribute(batch, batch)
+        timings.append(time.perf_counter() - batch_start)
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(batches)} batches, {sum(len(batch) for batch in batches) / (1024 * 1024):.2f} MiB, {len(session.translated_text)} sentences, {elapsed:.2f} seconds total\n")
+    print(f"{'batches':>15} {'avg ms/batch':>13}")
+
+    for i in range(0, len(timings), bucket_size):
+        bucket = timings[i:i + bucket_size]
+        print(f"{f'{i + 1}-{i + len(bucket)}':>15} {sum(bucket) * 1000 / len(bucket):>13.3f}")
+
+if __name__ == "__main__":
+    if(len(sys.argv) > 2):
+        print("Usage: python redistribute_benchmark.py [size_in_mib]")
+        sys.exit(1)
+
+    run_benchmark(int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) == 2 else 5 * 1024 * 1024)
@@ -11,11 +11,9 @@ parent_dir = current_dir.parent
 ## Add the parent directory to sys.path so 'modules' can be found
 sys.path.append(str(parent_dir))
 
-## third-party libraries
-from easytl import EasyTL
-
 ## custom modules
 from modules.common.toolkit import Toolkit
+from modules.common.cost_estimator import CostEstimator
 
 class TokenCounter:
 
@@ -62,7 +60,7 @@ class TokenCounter:
 
         text_to_translate = [line for line in self.text.splitlines()]
 
-        num_tokens, min_cost, self.MODEL = EasyTL.calculate_cost(text=text_to_translate, service=self.service, model=self.MODEL)
+        num_tokens, min_cost, self.MODEL = CostEstimator.estimate(text=text_to_translate, service=self.service, model=self.MODEL)
 
         print("\nNote that the cost estimate is not always accurate, and may be higher than the actual cost. However cost calculation now includes output tokens.\n")
 
@@ -19,6 +19,7 @@ from easytl import EasyTL, ALLOWED_GEMINI_MODELS, ALLOWED_OPENAI_MODELS
 ## custom modules
 from modules.common.toolkit import Toolkit
 from modules.common.file_ensurer import FileEnsurer
+from modules.common.cost_estimator import CostEstimator
 
 from modules.gui.gui_file_util import gui_get_text_from_file, gui_get_json_from_file
 from modules.gui.gui_json_util import GuiJsonUtil
@@ -1103,7 +1104,8 @@ class KudasaiGUI:
 
                 translation_instructions = translation_instructions_dict.get(Translator.TRANSLATION_METHOD)
 
-                num_tokens, estimated_cost, model = EasyTL.calculate_cost(text=text_to_translate, service=Translator.TRANSLATION_METHOD, model=model, translation_instructions=translation_instructions)
+                ## counted locally and cached, so clicking again on the same text (even after changing settings) is instant
+                num_tokens, estimated_cost, model = CostEstimator.estimate(text=text_to_translate, service=Translator.TRANSLATION_METHOD, model=model, translation_instructions=translation_instructions)
 
                 if(Translator.TRANSLATION_METHOD == "gemini"):
                     cost_estimation = f"As of Kudasai {Toolkit.CURRENT_VERSION}, Gemini Pro 1.0 is free to use under 15 requests per minute, Gemini Pro 1.5 is free to use under 2 requests per minute.\nIt is up to you to set these in the settings json.\n"